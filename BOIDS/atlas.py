@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from typing import Tuple
+
+import pygame as pg
+from pygame import gfxdraw
+
+# trójkącik rysowany na kwadracie IMAGE_SIZE x IMAGE_SIZE
+IMAGE_SIZE = 15
+TRIANGLE_POINTS = [(15, 5), (0, 2), (0, 8)]
+# co ile stopni trzymamy obrócony obrazek
+ANGLE_STEP = 4
+# 91 odcieni głodu boida x 90 kątów mieści się w całości
+MAX_SURFACES = 8192
+
+
+class SpriteAtlas:
+    def __init__(
+        self, max_surfaces: int = MAX_SURFACES, angle_step: int = ANGLE_STEP
+    ) -> None:
+        self.max_surfaces = max_surfaces
+        self.angle_step = angle_step
+        # (kolor, kąt) -> obrócona powierzchnia, najdawniej użyte na początku
+        self.surfaces: "OrderedDict[Tuple[Tuple[int, int, int], int], pg.Surface]"
+        self.surfaces = OrderedDict()
+        self.base_images: dict = {}
+
+    def quantize_angle(self, angle: float) -> int:
+        return round(angle / self.angle_step) * self.angle_step % 360
+
+    def get(self, color: Tuple[int, int, int], angle: float) -> pg.Surface:
+        key = (color, self.quantize_angle(angle))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        # obracamy tylko raz na cały proces, a nie raz na pojazd
+        surface = pg.transform.rotate(self.get_base_image(color), -key[1])
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def get_base_image(self, color: Tuple[int, int, int]) -> pg.Surface:
+        if color not in self.base_images:
+            # pg.SRCALPHA mówi, że ma przezroczystość obrazek
+            image = pg.Surface((IMAGE_SIZE, IMAGE_SIZE), pg.SRCALPHA)
+            gfxdraw.filled_polygon(image, TRIANGLE_POINTS, pg.Color(*color, 255))
+            self.base_images[color] = image
+        return self.base_images[color]
+
+
+# jeden atlas dla wszystkich pojazdów w procesie
+ATLAS = SpriteAtlas()
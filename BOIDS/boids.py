@@ -1,13 +1,33 @@
 import colorsys
+from functools import lru_cache
 from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
 import pygame as pg
+from food import FoodGroup
+from perception import PerceptionCone
+from random_source import RandomSource
 from vehicle import Vehicle
 
 if TYPE_CHECKING:
+    from flock import Flock
+    from neighbor_grid import NeighborGrid
     from predator import Predator
 
+# krok odcienia, poniżej którego nie zmieniamy koloru boida
+HUE_STEP = 0.01
+
+
+@lru_cache(maxsize=None)
+def hue_color(
+    base_color: Tuple[int, int, int], hue_shift: float
+) -> Tuple[int, int, int]:
+    # konwersja RGB -> HSV -> zmiana hue -> RGB
+    r, g, b = base_color
+    h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
+    new_rgb = colorsys.hsv_to_rgb(hue_shift, s, v)
+    return tuple(int(c * 255) for c in new_rgb)
+
 
 class Boid(Vehicle):
 
@@ -16,6 +36,7 @@ class Boid(Vehicle):
     normal_max_speed = 2.0
     # kąt obserwacji
     perception = 180
+    perception_cone = PerceptionCone(perception)
     # promień sąsiedzctwa
     neighborhood_radius = 70
     # waga wyrównania
@@ -27,7 +48,7 @@ class Boid(Vehicle):
     # odległośc minimalna
     d_min = 20
     # 0.0 = najedzony, 1.0 = maksymalny głód
-    hunger = 0.0
+    _hunger: float = 0.0
     # to jak szybko boid się głodzi w czasie
     hunger_rate = 0.0008
 
@@ -35,27 +56,160 @@ class Boid(Vehicle):
 
     food_attraction_factor = 0.5
 
-    food_group: pg.sprite.Group = None
+    food_group: Optional[FoodGroup] = None
     base_color: Tuple[int, int, int] = (209, 125, 146)
-    current_hue_level: Optional[int] = None
+    current_hue_level: Optional[float] = None
     # jak boid jest zmęczony, to się mu prędkość zmienia do 20%
     resting_max_speed: float = normal_max_speed * 0.2
     resting: bool = False
-
-    def __init__(self) -> None:
+    # boid należący do stada (Flock) trzyma stan w jego tablicach,
+    # a sam sprite jest tylko widokiem na wiersz flock_index
+    flock: Optional["Flock"] = None
+    flock_index: int = -1
+    # środek najbliższego jedzenia (None = boid nie szuka jedzenia);
+    # feed_all liczy je naraz dla wszystkich boidów przed update()
+    food_center: Optional[Tuple[float, float]] = None
+    fed_in_batch: bool = False
+
+    def __init__(
+        self,
+        world_size: Optional[Tuple[int, int]] = None,
+        random_source: Optional[RandomSource] = None,
+    ) -> None:
         super().__init__(
             color=self.base_color,
             max_speed=self.normal_max_speed,
+            world_size=world_size,
+            random_source=random_source,
         )
         self.boids: List[Boid] = []
         self.predator: Optional[Predator] = None
+        self.neighbor_grid: Optional[NeighborGrid] = None
+        # kandydaci na sąsiadów z listy Verleta (NeighborList)
+        self.neighbors: Optional[List[Boid]] = None
+
+    # dla boida ze stada position i velocity zwracają kopie wiersza tablic,
+    # więc zapis w miejscu (position.x = 0) ginie; stan zmienia się tylko
+    # przez settery albo w Flock.step
+    @property
+    def position(self) -> pg.Vector2:
+        if self.flock is None:
+            return self._position
+        return pg.Vector2(self.flock.positions[self.flock_index].tolist())
+
+    @position.setter
+    def position(self, value: pg.Vector2) -> None:
+        if self.flock is None:
+            self._position = value
+        else:
+            self.flock.positions[self.flock_index] = value
+
+    @property
+    def velocity(self) -> pg.Vector2:
+        if self.flock is None:
+            return self._velocity
+        return pg.Vector2(self.flock.velocities[self.flock_index].tolist())
+
+    @velocity.setter
+    def velocity(self, value: pg.Vector2) -> None:
+        if self.flock is None:
+            self._velocity = value
+        else:
+            self.flock.velocities[self.flock_index] = value
+
+    @property
+    def last_rotation_angle(self) -> int:
+        if self.flock is None:
+            return self._last_rotation_angle
+        return int(self.flock.headings[self.flock_index])
+
+    @last_rotation_angle.setter
+    def last_rotation_angle(self, value: int) -> None:
+        if self.flock is None:
+            self._last_rotation_angle = value
+        else:
+            self.flock.headings[self.flock_index] = value
+
+    @property
+    def hunger(self) -> float:
+        if self.flock is None:
+            return self._hunger
+        return float(self.flock.hunger[self.flock_index])
+
+    @hunger.setter
+    def hunger(self, value: float) -> None:
+        if self.flock is None:
+            self._hunger = value
+        else:
+            self.flock.hunger[self.flock_index] = value
+
+    def detach_from_flock(self) -> None:
+        # kopiujemy stan z tablic stada z powrotem do sprite'a
+        position, velocity = self.position, self.velocity
+        angle, hunger = self.last_rotation_angle, self.hunger
+        self.flock = None
+        self.flock_index = -1
+        self.position, self.velocity = position, velocity
+        self.last_rotation_angle, self.hunger = angle, hunger
+        self.heading = PerceptionCone.heading_from_angle(angle)
+
+    def kill(self) -> None:
+        if self.flock is not None:
+            self.flock.remove(self)
+        super().kill()
 
     def update(self) -> None:
-        self.check_resting_state()
-        self.make_boid_hungry()
-        self.eat_food()
+        if self.flock is not None:
+            # siły i ruch policzyło już stado (Flock.step)
+            self.sync_with_flock()
+            return
+        if not self.fed_in_batch:
+            self.check_resting_state()
+            self.make_boid_hungry()
+            self.eat_food()
+            self.food_center = self.find_closest_food()
+        self.fed_in_batch = False
         super().update(self.get_forces_influence(), self.max_acceleration)
 
+    @classmethod
+    def feed_all(cls, boids: List["Boid"], food_group: Optional[FoodGroup]) -> None:
+        # głód, jedzenie i najbliższe jedzenie dla wszystkich boidów naraz,
+        # jak w Flock.step: jedno zapytanie do FoodGroup zamiast N
+        for boid in boids:
+            boid.check_resting_state()
+            boid.make_boid_hungry()
+            boid.food_center = None
+            boid.fed_in_batch = True
+        if not boids or not food_group:
+            return
+        hunger = np.array([boid.hunger for boid in boids], dtype=np.float32)
+        hungry = np.flatnonzero(hunger > 0.3)
+        if len(hungry):
+            rects = np.array([boids[i].rect for i in hungry], dtype=np.float32)
+            for i in hungry[food_group.eat(rects)].tolist():
+                boids[i].hunger = 0.0
+                hunger[i] = 0.0
+        seeking = np.flatnonzero(hunger >= 0.3)
+        if not food_group or len(seeking) == 0:
+            return
+        positions = np.array([boids[i].position for i in seeking], dtype=np.float32)
+        indices, _ = food_group.nearest(positions)
+        for i, center in zip(seeking.tolist(), food_group.centers[indices].tolist()):
+            boids[i].food_center = tuple(center)
+
+    def move(self, external_forces: pg.Vector2, max_acceleration: float) -> None:
+        # Vehicle.move i avoid_edge piszą w position/velocity w miejscu,
+        # co dla boida ze stada zmieniłoby tylko kopie
+        if self.flock is not None:
+            raise RuntimeError("boid ze stada porusza tylko Flock.step")
+        super().move(external_forces, max_acceleration)
+
+    def sync_with_flock(self) -> None:
+        # jedzenie też zjada stado, wszystkie boidy naraz
+        self.update_hue()
+        self.image = self.get_rotated_image(self.last_rotation_angle)
+        self.rect = self.image.get_rect(center=self.position)
+
     def check_resting_state(self) -> None:
         if self.hunger > 0.7:
             if not self.resting:
@@ -70,65 +224,49 @@ class Boid(Vehicle):
                 self.resting = False
                 self.max_speed = self.normal_max_speed
 
+    def find_closest_food(self) -> Optional[Tuple[float, float]]:
+        # pojedynczy boid bez feed_all pyta FoodGroup sam za siebie
+        if not self.food_group or self.hunger < 0.3:
+            return None
+        indices, _ = self.food_group.nearest(
+            np.array([self.position], dtype=np.float32)
+        )
+        return tuple(self.food_group.centers[indices[0]].tolist())
+
     def get_food_influence(self) -> pg.Vector2:
-        if self.food_group is None or self.hunger < 0.3:
+        if self.food_center is None:
             return pg.Vector2(0, 0)
 
-        closest_food = min(
-            self.food_group,
-            key=lambda food: self.position.distance_to(food.rect.center),
-            default=None,
-        )
-
-        if closest_food:
-            direction = pg.Vector2(closest_food.rect.center) - self.position
-            if direction.length() > 0:
-                direction = direction.normalize()
-                influence_strength = self.hunger * self.food_attraction_factor
-                return direction * influence_strength
+        direction = pg.Vector2(self.food_center) - self.position
+        if direction.length() > 0:
+            direction = direction.normalize()
+            influence_strength = self.hunger * self.food_attraction_factor
+            return direction * influence_strength
 
         return pg.Vector2(0, 0)
 
     def eat_food(self) -> None:
         # jeśli jest jakieś jedzenie i boid jest już w miarę głodny
-        if self.food_group is not None and self.hunger > 0.3:
-            eaten = pg.sprite.spritecollide(
-                sprite=self, group=self.food_group, dokill=True
-            )
-            if eaten:
+        if self.food_group and self.hunger > 0.3:
+            fed = self.food_group.eat(np.array([self.rect], dtype=np.float32))
+            if fed[0]:
                 self.hunger = 0.0
 
     def make_boid_hungry(self) -> None:
         self.hunger = min(self.max_hunger, self.hunger + self.hunger_rate)
+        self.update_hue()
+
+    def update_hue(self) -> None:
         # przelicz głód na hue
         # max 0.9, by nie zawijać do czerwieni
-        hue_shift = (1 - self.hunger) * 0.9
-        if (
-            self.current_hue_level is not None
-            and abs(hue_shift - self.current_hue_level) < 0.01
-        ):
+        hue_shift = round((1 - self.hunger) * 0.9 / HUE_STEP) * HUE_STEP
+        if hue_shift == self.current_hue_level:
             # pomiń aktualizację, jeśli zmiana zbyt mała
             return
 
         self.current_hue_level = hue_shift
-
-        # konwersja RGB -> HSV -> zmiana hue -> RGB
-        r, g, b = self.base_color
-        h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
-        new_rgb = colorsys.hsv_to_rgb(hue_shift, s, v)
-        new_color = tuple(int(c * 255) for c in new_rgb)
-
-        # rysowanie trójkąta od nowa
-        # przezroczyste tło
-        self.original_image.fill((0, 0, 0, 0))
-        pg.gfxdraw.filled_polygon(
-            self.original_image,
-            self.TRIANGLE_POINTS,
-            new_color,
-        )
-
-        # wyczyść cache, by rotacje miały nowy kolor
-        self.angle_cache.clear()
+        # gotowe obrócone trójkąty w tym kolorze bierzemy ze wspólnego atlasu
+        self.set_color(hue_color(self.base_color, hue_shift))
 
     def get_forces_influence(self) -> pg.Vector2:
         cohesion_force: pg.Vector2 = pg.Vector2(0, 0)
@@ -143,48 +281,39 @@ class Boid(Vehicle):
         cohesion_sum: pg.Vector2 = pg.Vector2(0, 0)
         alignment_sum: pg.Vector2 = pg.Vector2(0, 0)
         separation_sum: pg.Vector2 = pg.Vector2(0, 0)
-        # zmieniamy na radiany,
-        # bo to przyspiesza pracę (zamiast liczyć np.degrees co iterację)
-        cached_angle_rad = np.radians(self.last_rotation_angle)
-        perception_half = np.radians(self.perception / 2)
-        for boid in self.boids:
+        # z listą Verleta patrzymy tylko na zapamiętanych kandydatów,
+        # z siatką tylko na komórki 3x3 wokół boida
+        if self.neighbors is not None:
+            candidates = self.neighbors
+        elif self.neighbor_grid is not None:
+            candidates = self.neighbor_grid.get_nearby(self.position)
+        else:
+            candidates = self.boids
+        for boid in candidates:
             if boid is not self:
                 # obliczamy odległość
-                distance = self.position.distance_to(boid.position)
+                direction = boid.position - self.position
+                distance = direction.length()
 
                 # jeśli boid znajduje się w zasięgu (neighborhood_radius)
-                if distance < self.neighborhood_radius:
-
-                    angle_to_boid = np.arctan2(
-                        boid.position.y - self.position.y,
-                        boid.position.x - self.position.x,
-                    )
-
-                    # obliczamy różnicę między kątami (w radianach)
-                    angle_diff = np.abs(cached_angle_rad - angle_to_boid)
-
-                    # sprawdzamy różnicę kątów, jeśli jest większa niż 180,
-                    #  to zmniejszamy ją
-                    if angle_diff > np.pi:
-                        angle_diff = 2 * np.pi - angle_diff
-
-                    # jeśli boid znajduje się w zasięgu pola widzenia
-                    if angle_diff < perception_half:
-                        # cohesion
-                        cohesion_sum += boid.position
-                        # alignment
-                        alignment_sum += boid.velocity
-                        neighbors_count += 1
-
-                        # separation
-                        if 0 < distance < self.d_min:
-                            direction = boid.position - self.position
-                            # zastosowanie wzoru na siłę separacji
-                            separation_strength = self.separation_factor * (
-                                (1 - (self.d_min / abs(distance))) * direction
-                            )
-                            separation_sum += separation_strength
-                            separation_count += 1
+                # i w zasięgu pola widzenia
+                if distance < self.neighborhood_radius and (
+                    self.perception_cone.contains(self.heading, direction, distance)
+                ):
+                    # cohesion
+                    cohesion_sum += boid.position
+                    # alignment
+                    alignment_sum += boid.velocity
+                    neighbors_count += 1
+
+                    # separation
+                    if 0 < distance < self.d_min:
+                        # zastosowanie wzoru na siłę separacji
+                        separation_strength = self.separation_factor * (
+                            (1 - (self.d_min / abs(distance))) * direction
+                        )
+                        separation_sum += separation_strength
+                        separation_count += 1
         if neighbors_count > 0:
             average_position = cohesion_sum / neighbors_count
             cohesion_force = self.cohesion_factor * (average_position - self.position)
@@ -214,8 +343,14 @@ class Boid(Vehicle):
     def set_boids(self, boids: List["Boid"]) -> None:
         self.boids = boids
 
+    def set_neighbor_grid(self, neighbor_grid: "NeighborGrid") -> None:
+        self.neighbor_grid = neighbor_grid
+
+    def set_neighbors(self, neighbors: List["Boid"]) -> None:
+        self.neighbors = neighbors
+
     def set_predator(self, predator: "Predator") -> None:
         self.predator = predator
 
-    def set_food_group(self, food_group: pg.sprite.Group) -> None:
+    def set_food_group(self, food_group: FoodGroup) -> None:
         self.food_group = food_group
@@ -0,0 +1,277 @@
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pygame as pg
+
+from boids import Boid
+from food import FoodGroup
+from perception import PerceptionCone
+from random_source import DEFAULT_RANDOM, RandomSource
+
+if TYPE_CHECKING:
+    from neighbor_grid import NeighborGrid
+    from neighbor_list import NeighborList
+    from predator import Predator
+
+
+class Flock:
+    # ile par (obserwator, sąsiad) liczymy naraz,
+    # żeby przy dużych stadach nie zapchać pamięci
+    pair_chunk_size: int = 1 << 20
+
+    def __init__(
+        self,
+        world_size: Tuple[int, int],
+        capacity: int = 256,
+        neighbor_index: Optional[Union["NeighborGrid", "NeighborList"]] = None,
+        random_source: Optional[RandomSource] = None,
+    ) -> None:
+        self.world_size = world_size
+        self.random_source = random_source or DEFAULT_RANDOM
+        # bez indeksu sprawdzamy wszystkie pary, z siatką tylko komórki 3x3,
+        # a z listą Verleta pary zapamiętane z ostatniej przebudowy
+        self.neighbor_index = neighbor_index
+        self.count: int = 0
+        # stan całego stada w ciągłych tablicach float32,
+        # wiersz i odpowiada boidowi self.boids[i]
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 2), dtype=np.float32)
+        # kąt obrotu w stopniach (odpowiednik Vehicle.last_rotation_angle)
+        self.headings = np.zeros(capacity, dtype=np.float32)
+        self.hunger = np.zeros(capacity, dtype=np.float32)
+        self.resting = np.zeros(capacity, dtype=bool)
+        self.boids: List[Boid] = []
+
+        # wagi sterowane suwakami, domyślnie jak w klasie Boid
+        self.cohesion_factor: float = Boid.cohesion_factor
+        self.alignment_factor: float = Boid.alignment_factor
+        self.separation_factor: float = Boid.separation_factor
+
+    def add(self, boid: Boid) -> None:
+        if self.count == len(self.positions):
+            self._grow()
+        index = self.count
+        self.positions[index] = boid.position
+        self.velocities[index] = boid.velocity
+        self.headings[index] = boid.last_rotation_angle
+        self.hunger[index] = boid.hunger
+        self.resting[index] = boid.resting
+        self.boids.append(boid)
+        self.count += 1
+        # od teraz sprite jest tylko widokiem na swój wiersz
+        boid.flock = self
+        boid.flock_index = index
+
+    def remove(self, boid: Boid) -> None:
+        index = boid.flock_index
+        last = self.count - 1
+        # oddajemy boidowi jego stan, żeby po odpięciu nadal był spójny
+        boid.detach_from_flock()
+        # na zwolnione miejsce przenosimy ostatni wiersz
+        if index != last:
+            for array in (
+                self.positions,
+                self.velocities,
+                self.headings,
+                self.hunger,
+                self.resting,
+            ):
+                array[index] = array[last]
+            moved = self.boids[last]
+            self.boids[index] = moved
+            moved.flock_index = index
+        self.boids.pop()
+        self.count -= 1
+
+    def _grow(self) -> None:
+        capacity = max(1, 2 * len(self.positions))
+        for name in ("positions", "velocities", "headings", "hunger", "resting"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def nearest(self, position: pg.Vector2) -> Tuple[int, float]:
+        offsets = self.positions[: self.count] - np.asarray(position, np.float32)
+        distances = np.einsum("ij,ij->i", offsets, offsets)
+        index = int(np.argmin(distances))
+        return index, float(np.sqrt(distances[index]))
+
+    def step(
+        self,
+        predator: Optional["Predator"] = None,
+        food_group: Optional[FoodGroup] = None,
+    ) -> None:
+        if self.count == 0:
+            return
+        self._update_hunger()
+        self._eat_food(food_group)
+        forces = self._flocking_forces()
+        forces += self._fear_forces(predator)
+        forces += self._food_forces(food_group)
+        self._integrate(forces)
+
+    def _update_hunger(self) -> None:
+        n = self.count
+        hunger = self.hunger[:n]
+        # odpowiednik Boid.check_resting_state
+        tired = hunger > 0.7
+        self.resting[:n] = tired
+        hunger[tired] = np.maximum(hunger[tired] - 0.002, 0.6)
+        # odpowiednik Boid.make_boid_hungry
+        np.minimum(hunger + Boid.hunger_rate, Boid.max_hunger, out=hunger)
+
+    def _candidate_pairs(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        n = self.count
+        if self.neighbor_index is not None:
+            yield from self.neighbor_index.candidate_pairs(self.positions[:n])
+            return
+        # wszystkie pary i != j, podzielone na kawałki po kilka wierszy
+        rows = max(1, self.pair_chunk_size // n)
+        others = np.arange(n)
+        for start in range(0, n, rows):
+            stop = min(n, start + rows)
+            i = np.repeat(np.arange(start, stop), n)
+            j = np.tile(others, stop - start)
+            keep = i != j
+            yield i[keep], j[keep]
+
+    def _flocking_forces(self) -> np.ndarray:
+        n = self.count
+        positions = self.positions[:n]
+        velocities = self.velocities[:n]
+        # wektory jednostkowe liczymy raz na boida, a nie raz na parę
+        headings = PerceptionCone.headings_from_angles(self.headings[:n])
+
+        cohesion_sum = np.zeros((n, 2))
+        alignment_sum = np.zeros((n, 2))
+        separation_sum = np.zeros((n, 2))
+        neighbors_count = np.zeros(n)
+        separation_count = np.zeros(n)
+
+        for i, j in self._candidate_pairs():
+            offsets = positions[j] - positions[i]
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+            visible = (distances < Boid.neighborhood_radius) & (
+                Boid.perception_cone.contains_many(headings[i], offsets, distances)
+            )
+            i, j = i[visible], j[visible]
+            offsets, distances = offsets[visible], distances[visible]
+
+            neighbors_count += np.bincount(i, minlength=n)
+            for axis in (0, 1):
+                cohesion_sum[:, axis] += np.bincount(
+                    i, weights=positions[j, axis], minlength=n
+                )
+                alignment_sum[:, axis] += np.bincount(
+                    i, weights=velocities[j, axis], minlength=n
+                )
+
+            close = (distances > 0) & (distances < Boid.d_min)
+            i, offsets, distances = i[close], offsets[close], distances[close]
+            strength = self.separation_factor * (1 - Boid.d_min / distances)
+            separation_count += np.bincount(i, minlength=n)
+            for axis in (0, 1):
+                separation_sum[:, axis] += np.bincount(
+                    i, weights=strength * offsets[:, axis], minlength=n
+                )
+
+        forces = np.zeros((n, 2), dtype=np.float32)
+        has_neighbors = neighbors_count > 0
+        count = neighbors_count[has_neighbors, None]
+        forces[has_neighbors] += self.cohesion_factor * (
+            cohesion_sum[has_neighbors] / count - positions[has_neighbors]
+        )
+        forces[has_neighbors] += self.alignment_factor * (
+            alignment_sum[has_neighbors] / count - velocities[has_neighbors]
+        )
+        has_close = separation_count > 0
+        forces[has_close] += (
+            separation_sum[has_close] / separation_count[has_close, None]
+        )
+        return forces
+
+    def _fear_forces(self, predator: Optional["Predator"]) -> np.ndarray:
+        n = self.count
+        forces = np.zeros((n, 2), dtype=np.float32)
+        if predator is None:
+            return forces
+        away = self.positions[:n] - np.asarray(predator.position, np.float32)
+        distances = np.hypot(away[:, 0], away[:, 1])
+        scared = (distances > 0) & (distances < Boid.neighborhood_radius)
+        # wektor odwrotny od predatora, tym silniejszy im predator bliżej
+        forces[scared] = (
+            away[scared]
+            / distances[scared, None]
+            * (Boid.neighborhood_radius - distances[scared, None])
+        )
+        return forces
+
+    def _eat_food(self, food_group: Optional[FoodGroup]) -> None:
+        n = self.count
+        if not food_group:
+            return
+        # jak w Boid.eat_food jedzą tylko boidy w miarę głodne
+        eaters = np.flatnonzero(self.hunger[:n] > 0.3)
+        if len(eaters) == 0:
+            return
+        # prostokąt obróconego kwadratu 15x15, tak jak po pg.transform.rotate
+        radians = np.radians(self.headings[eaters])
+        sizes = Boid.image_size * (np.abs(np.cos(radians)) + np.abs(np.sin(radians)))
+        rects = np.empty((len(eaters), 4), dtype=np.float32)
+        rects[:, :2] = self.positions[eaters] - sizes[:, None] / 2
+        rects[:, 2] = rects[:, 3] = sizes
+        fed = food_group.eat(rects)
+        self.hunger[eaters[fed]] = 0.0
+
+    def _food_forces(self, food_group: Optional[FoodGroup]) -> np.ndarray:
+        n = self.count
+        forces = np.zeros((n, 2), dtype=np.float32)
+        if not food_group:
+            return forces
+        hungry = np.flatnonzero(self.hunger[:n] >= 0.3)
+        if len(hungry) == 0:
+            return forces
+        indices, lengths = food_group.nearest(self.positions[hungry])
+        closest = food_group.centers[indices] - self.positions[hungry]
+        moving = lengths > 0
+        hungry, closest, lengths = hungry[moving], closest[moving], lengths[moving]
+        strength = self.hunger[hungry] * Boid.food_attraction_factor
+        forces[hungry] = closest / lengths[:, None] * strength[:, None]
+        return forces
+
+    def _integrate(self, forces: np.ndarray) -> None:
+        n = self.count
+        positions = self.positions[:n]
+        velocities = self.velocities[:n]
+
+        velocities += self._clamp(forces, Boid.max_acceleration)
+        # zaburzenia jak w Vehicle.add_noise
+        angles = self.random_source.uniform_array(0, 2 * np.pi, (n, 2))
+        velocities[:, 0] += 0.01 * np.sin(angles[:, 0])
+        velocities[:, 1] += 0.01 * np.cos(angles[:, 1])
+
+        max_speed = np.where(
+            self.resting[:n], Boid.resting_max_speed, Boid.normal_max_speed
+        )
+        velocities[:] = self._clamp(velocities, max_speed)
+        positions += velocities
+
+        # odbijanie od brzegów świata
+        for axis, limit in enumerate(self.world_size):
+            outside = (positions[:, axis] < 0) | (positions[:, axis] > limit)
+            velocities[outside, axis] *= -1
+            np.clip(positions[:, axis], 0, limit, out=positions[:, axis])
+
+        # kąt obrotu jak w Vehicle.update_rotation
+        speed = np.hypot(velocities[:, 0], velocities[:, 1])
+        angles = np.round(np.degrees(np.arctan2(velocities[:, 1], velocities[:, 0])))
+        headings = self.headings[:n]
+        turned = (speed > 0.1) & (np.abs(angles - headings) > 1)
+        headings[turned] = angles[turned]
+
+    @staticmethod
+    def _clamp(vectors: np.ndarray, max_length) -> np.ndarray:
+        lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+        scale = np.minimum(1.0, max_length / np.maximum(lengths, 1e-12))
+        return (vectors * scale[:, None]).astype(np.float32)
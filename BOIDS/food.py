@@ -1,7 +1,10 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
 import pygame as pg
 
 
-class Food(pg.sprite.Sprite):
+class Food(pg.sprite.DirtySprite):
     def __init__(self, position):
         super().__init__()
         radius = 3
@@ -24,3 +27,90 @@ class Food(pg.sprite.Sprite):
         )
 
         self.rect = self.image.get_rect(center=position)
+
+
+class FoodGroup(pg.sprite.Group):
+    # ile par (boid, jedzenie) sprawdzamy naraz
+    chunk_size: int = 1 << 20
+
+    def __init__(self, *sprites: Food) -> None:
+        # środki i prostokąty jedzenia w tablicach, uaktualniane przy
+        # dodaniu i zjedzeniu, żeby zapytania robić dla wszystkich boidów naraz
+        self.centers = np.zeros((16, 2), dtype=np.float32)
+        self.rects = np.zeros((16, 4), dtype=np.float32)
+        self.foods: List[Food] = []
+        self.food_index: Dict[Food, int] = {}
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite: Food, layer=None) -> None:
+        super().add_internal(sprite, layer)
+        index = len(self.foods)
+        if index == len(self.centers):
+            self.centers = np.resize(self.centers, (2 * index, 2))
+            self.rects = np.resize(self.rects, (2 * index, 4))
+        self.centers[index] = sprite.rect.center
+        self.rects[index] = sprite.rect
+        self.foods.append(sprite)
+        self.food_index[sprite] = index
+
+    def remove_internal(self, sprite: Food) -> None:
+        super().remove_internal(sprite)
+        index = self.food_index.pop(sprite)
+        last = len(self.foods) - 1
+        # na zwolnione miejsce przenosimy ostatnie jedzenie
+        if index != last:
+            moved = self.foods[last]
+            self.foods[index] = moved
+            self.food_index[moved] = index
+            self.centers[index] = self.centers[last]
+            self.rects[index] = self.rects[last]
+        self.foods.pop()
+
+    def nearest(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # najbliższe jedzenie (indeks w self.foods) i odległość dla każdej pozycji
+        count = len(self.foods)
+        centers = self.centers[:count]
+        indices = np.empty(len(positions), dtype=np.intp)
+        distances = np.empty(len(positions), dtype=np.float32)
+        rows = max(1, self.chunk_size // max(1, count))
+        for start in range(0, len(positions), rows):
+            chunk = positions[start : start + rows]
+            offsets = centers[None, :, :] - chunk[:, None, :]
+            squared = np.einsum("ijk,ijk->ij", offsets, offsets)
+            closest = np.argmin(squared, axis=1)
+            indices[start : start + rows] = closest
+            distances[start : start + rows] = np.sqrt(
+                squared[np.arange(len(chunk)), closest]
+            )
+        return indices, distances
+
+    def first_colliders(self, rects: np.ndarray) -> np.ndarray:
+        # dla każdego jedzenia indeks pierwszego prostokąta (x, y, w, h),
+        # który na nie nachodzi, albo -1; zasady jak Rect.colliderect
+        count = len(self.foods)
+        colliders = np.full(count, -1, dtype=np.intp)
+        if len(rects) == 0:
+            return colliders
+        rows = max(1, self.chunk_size // len(rects))
+        for start in range(0, count, rows):
+            food = self.rects[start : min(count, start + rows)]
+            overlap = (
+                (food[:, None, 0] < rects[None, :, 0] + rects[None, :, 2])
+                & (rects[None, :, 0] < food[:, None, 0] + food[:, None, 2])
+                & (food[:, None, 1] < rects[None, :, 1] + rects[None, :, 3])
+                & (rects[None, :, 1] < food[:, None, 1] + food[:, None, 3])
+            )
+            first = np.argmax(overlap, axis=1)
+            colliders[start : start + len(food)] = np.where(
+                overlap[np.arange(len(food)), first], first, -1
+            )
+        return colliders
+
+    def eat(self, rects: np.ndarray) -> np.ndarray:
+        # każde jedzenie zjada pierwszy prostokąt, który na nie nachodzi;
+        # zwraca, które prostokąty coś zjadły
+        colliders = self.first_colliders(rects)
+        eaten = np.flatnonzero(colliders >= 0)
+        for food in [self.foods[index] for index in eaten]:
+            food.kill()
+        return np.bincount(colliders[eaten], minlength=len(rects)) > 0
@@ -1,74 +1,156 @@
+import argparse
+import time
+from typing import Optional, Tuple
+
 import numpy as np
 import pygame as pg
-from food import Food
+from flock import Flock
+from food import Food, FoodGroup
+from neighbor_grid import NeighborGrid
+from neighbor_list import NeighborList
 from predator import Predator
+from random_source import RandomSource
 from slider import Slider
+from timestep import FixedTimestep
 
 from boids import Boid
 
 BOIDS_NUM = 100
+# zapas promienia listy sąsiadów Verleta (0 = sama siatka co klatkę)
+NEIGHBOR_SKIN = 10
+# zmiana trybu ataku co 30 s i jedzenie co 5 s przy 60 krokach na sekundę;
+# liczymy w krokach symulacji, żeby tryb bez okna zachowywał się tak samo
+ATTACK_TOGGLE_TICKS = 30 * 60
+FOOD_SPAWN_TICKS = 5 * 60
+# domyślnie tyle samo kroków symulacji co klatek na sekundę
+TICK_RATE = 60
+FRAME_RATE = 60
+# liczba kroków w trybie bez okna
+HEADLESS_TICKS = 1000
+# bez okna nie ma suwaków, więc przyjmujemy ich wartość początkową
+HEADLESS_SLIDER_VALUE = 50
 
 
 class Simulation:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        boids_num: int = BOIDS_NUM,
+        vectorized: bool = False,
+        neighbor_skin: float = NEIGHBOR_SKIN,
+        headless: bool = False,
+        world_size: Tuple[int, int] = (500, 500),
+        tick_rate: Optional[float] = TICK_RATE,
+        frame_rate: float = FRAME_RATE,
+        render_every: int = 1,
+        dirty_rects: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.boids_num = boids_num
+        # czy siły całego stada liczymy wektorowo w Flock
+        self.vectorized = vectorized
+        self.neighbor_skin = neighbor_skin
+        # bez okna: jawne granice świata, brak suwaków i renderowania
+        self.headless = headless
+        # kroki symulacji liczone niezależnie od rysowania,
+        # tick_rate = None to przewijanie z rysowaniem co render_every kroków
+        self.tick_rate = tick_rate
+        self.frame_rate = frame_rate
+        self.render_every = render_every
+        # rysujemy i wysyłamy na ekran tylko zmienione prostokąty
+        self.dirty_rects = dirty_rects
+        # jedno źródło losowości na symulację, z ziarnem dla powtarzalności
+        self.seed = seed
+        self.random_source = RandomSource(seed)
+        self.flock = None
+        self.neighbor_list = None
+        self.tick_count = 0
         self._running = True
         self._display_surf = None
         self._paused = False
-        self.size = self.width, self.height = 500, 500
-        self.timer_event = pg.USEREVENT + 1
-        self.food_event = pg.USEREVENT + 2
+        self.size = self.width, self.height = world_size
+        self.sliders = None
 
     def on_init(self) -> None:
 
         pg.init()
 
-        self._display_surf = pg.display.set_mode(
-            size=self.size,
-            flags=pg.SCALED,
-            vsync=1,
-        )
-        self.background = pg.Surface(self._display_surf.get_size())
-        self.background.fill((0, 0, 0))
-        pg.display.set_caption("boids")
+        if not self.headless:
+            self._display_surf = pg.display.set_mode(
+                size=self.size,
+                flags=pg.SCALED,
+                vsync=1,
+            )
+            self.background = pg.Surface(self._display_surf.get_size())
+            self.background.fill((0, 0, 0))
+            pg.display.set_caption("boids")
 
-        self.clock = pg.time.Clock()
-        # ustawiamy timer zmiany trybu ataku na 30s
-        pg.time.set_timer(self.timer_event, 30000)
-        # pojawianie się jedzenia co 5 sekund
-        pg.time.set_timer(self.food_event, 5000)
         self._running = True
 
-        self.all_sprites_group = pg.sprite.Group()
+        if self.dirty_rects:
+            self.all_sprites_group = pg.sprite.LayeredDirty()
+            if not self.headless:
+                self.all_sprites_group.clear(self._display_surf, self.background)
+        else:
+            self.all_sprites_group = pg.sprite.Group()
         self.boids = pg.sprite.Group()
         self.predators = pg.sprite.Group()
-        self.sliders = pg.sprite.Group()
-        self.food_group = pg.sprite.Group()
+        self.food_group = FoodGroup()
 
         for _ in range(20):
             food = Food(
                 position=(
-                    np.random.randint(50, 450),
-                    np.random.randint(50, 450),
+                    self.random_source.integers(50, self.width - 50),
+                    self.random_source.integers(50, self.height - 50),
                 )
             )
             self.food_group.add(food)
             self.all_sprites_group.add(food)
 
-        for _ in range(BOIDS_NUM):
-            boid = Boid()
+        # komórka wielkości promienia sąsiedztwa, więc wystarczą komórki 3x3
+        self.neighbor_grid = NeighborGrid(
+            world_size=self.size,
+            cell_size=Boid.neighborhood_radius,
+        )
+        if self.neighbor_skin > 0:
+            self.neighbor_list = NeighborList(
+                world_size=self.size,
+                radius=Boid.neighborhood_radius,
+                skin=self.neighbor_skin,
+            )
+        if self.vectorized:
+            self.flock = Flock(
+                world_size=self.size,
+                capacity=self.boids_num,
+                neighbor_index=self.neighbor_list or self.neighbor_grid,
+                random_source=self.random_source,
+            )
+
+        for _ in range(self.boids_num):
+            boid = Boid(world_size=self.size, random_source=self.random_source)
             self.boids.add(boid)
             self.all_sprites_group.add(boid)
+            if self.flock is not None:
+                self.flock.add(boid)
 
-        self.predator = Predator()
-        self.predator.set_prey(boids=self.boids)
+        self.predator = Predator(
+            world_size=self.size,
+            random_source=self.random_source,
+        )
+        self.predator.set_prey(boids=self.boids, flock=self.flock)
         self.all_sprites_group.add(self.predator)
         self.predators.add(self.predator)
 
         for boid in self.boids:
             boid.set_boids(boids=self.boids)
+            boid.set_neighbor_grid(neighbor_grid=self.neighbor_grid)
             boid.set_predator(predator=self.predator)
             boid.set_food_group(self.food_group)
 
+        if not self.headless:
+            self.create_sliders()
+
+    def create_sliders(self) -> None:
+        self.sliders = pg.sprite.Group()
         self.cohesion_slider = Slider(
             position=(self.width - 100, 50),
             size=(100, 1),
@@ -110,8 +192,8 @@ class Simulation:
             self.all_sprites_group.add(slider)
 
     def spawn_food(self) -> None:
-        x = np.random.randint(0, self._display_surf.get_width())
-        y = np.random.randint(0, self._display_surf.get_height())
+        x = self.random_source.integers(0, self.width)
+        y = self.random_source.integers(0, self.height)
         new_food = Food((x, y))
         self.food_group.add(new_food)
         self.all_sprites_group.add(new_food)
@@ -122,22 +204,56 @@ class Simulation:
         # przekazywanie zdarzeń do suwaków
         for slider in self.sliders.sprites():
             slider.handle_event(event)
-        # co 30 sekund wyłącz tryb ataku predatorowi
-        if event.type == self.timer_event:
-            self.predator.attack = not self.predator.attack
-        if event.type == self.food_event and not self._paused:
-            self.spawn_food()
         if event.type == pg.KEYDOWN and self._paused:
             if event.key == pg.K_r:
-                self.__init__()
-                self.on_init()
+                self.restart()
+
+    def restart(self) -> None:
+        self.__init__(
+            boids_num=self.boids_num,
+            vectorized=self.vectorized,
+            neighbor_skin=self.neighbor_skin,
+            headless=self.headless,
+            world_size=self.size,
+            tick_rate=self.tick_rate,
+            frame_rate=self.frame_rate,
+            render_every=self.render_every,
+            dirty_rects=self.dirty_rects,
+            seed=self.seed,
+        )
+        self.on_init()
+
+    def apply_slider_values(self) -> None:
+        # aktualizacja wartości boidów według wartości z suwaków,
+        # bez okna zostają wartości początkowe suwaków
+        if self.sliders is None:
+            cohesion = separation = alignment = HEADLESS_SLIDER_VALUE
+        else:
+            cohesion = self.cohesion_slider.get_value()
+            separation = self.separation_slider.get_value()
+            alignment = self.alignment_slider.get_value()
+        cohesion_factor = cohesion * 0.001
+        separation_factor = separation * 0.01
+        alignment_factor = alignment * 0.01
+        if self.flock is not None:
+            self.flock.cohesion_factor = cohesion_factor
+            self.flock.separation_factor = separation_factor
+            self.flock.alignment_factor = alignment_factor
+        else:
+            for boid in self.boids:
+                boid.cohesion_factor = cohesion_factor
+                boid.separation_factor = separation_factor
+                boid.alignment_factor = alignment_factor
 
     def on_loop(self) -> None:
-        # aktualizacja wartości boidów według wartości z suwaków
-        for boid in self.boids:
-            boid.cohesion_factor = self.cohesion_slider.get_value() * 0.001
-            boid.separation_factor = self.separation_slider.get_value() * 0.01
-            boid.alignment_factor = self.alignment_slider.get_value() * 0.01
+        # co 30 sekund wyłącz tryb ataku predatorowi
+        if self.tick_count % ATTACK_TOGGLE_TICKS == ATTACK_TOGGLE_TICKS - 1:
+            self.predator.attack = not self.predator.attack
+        # pojawianie się jedzenia co 5 sekund
+        if self.tick_count % FOOD_SPAWN_TICKS == FOOD_SPAWN_TICKS - 1:
+            if not self._paused:
+                self.spawn_food()
+        self.apply_slider_values()
         # sprawdzamy kolizję drapieżnika z boidami i jeśli jest w trybie ataku
         # to usuwamy zaatakowane boidy
         pg.sprite.spritecollide(
@@ -150,14 +266,53 @@ class Simulation:
             print("Wszystkie boidy nie żyją. Pauza.")
             # zapauj symulację
             self._paused = True
+        if self.flock is not None:
+            # jeden wspólny krok dla całego stada, sprite'y tylko się synchronizują
+            self.flock.step(self.predator, self.food_group)
+        elif self.neighbor_list is not None:
+            self.update_neighbor_lists()
+        else:
+            # siatkę przebudowujemy raz na klatkę, już bez zjedzonych boidów
+            self.neighbor_grid.rebuild(self.boids)
+        if self.flock is None:
+            # jedzenie dla wszystkich boidów jednym zapytaniem na klatkę
+            Boid.feed_all(self.boids.sprites(), self.food_group)
         self.all_sprites_group.update()
+        self.tick_count += 1
 
-    def on_render(self) -> None:
-        self.all_sprites_group.clear(
-            surface=self._display_surf,
-            bgd=self.background,
+    def update_neighbor_lists(self) -> None:
+        boids = self.boids.sprites()
+        if not boids:
+            return
+        positions = np.array([boid.position for boid in boids], dtype=np.float32)
+        # listy kandydatów zmieniają się tylko po przebudowie
+        if self.neighbor_list.update(positions):
+            for boid, neighbors in zip(
+                boids, self.neighbor_list.neighbors_of_each(len(boids))
+            ):
+                boid.set_neighbors([boids[j] for j in neighbors])
+
+    def show_neighbor_stats(self) -> None:
+        # jak często przebudowujemy listę sąsiadów, do strojenia NEIGHBOR_SKIN
+        if self.neighbor_list is None:
+            return
+        print(
+            f"przebudowy listy sąsiadów: {self.neighbor_list.rebuild_count}"
+            f"/{self.neighbor_list.step_count}"
+            f" ({self.neighbor_list.rebuild_ratio:.0%})"
         )
-        self.all_sprites_group.draw(surface=self._display_surf)
+
+    def on_render(self) -> None:
+        if self.dirty_rects:
+            # LayeredDirty sam czyści stare pozycje i zwraca zmienione obszary
+            changed = self.all_sprites_group.draw(self._display_surf)
+        else:
+            self.all_sprites_group.clear(
+                surface=self._display_surf,
+                bgd=self.background,
+            )
+            self.all_sprites_group.draw(surface=self._display_surf)
+            changed = None
         if self._paused:
             # zatrzymujemy predatora
             # i wyświetlamy tekst wielki na ekran
@@ -177,8 +332,9 @@ class Simulation:
                 )
             )
             self._display_surf.blit(text, text_rect)
-        pg.display.update()
-        self.clock.tick(60)
+            if changed is not None:
+                changed.append(text_rect)
+        pg.display.update(changed)
 
     def on_cleanup(self) -> None:
         pg.quit()
@@ -188,17 +344,111 @@ class Simulation:
     def on_execute(self) -> None:
         if self.on_init() is False:
             self._running = False
+        timestep = FixedTimestep(
+            tick_rate=self.tick_rate,
+            frame_rate=self.frame_rate,
+            render_every=self.render_every,
+        )
         while self._running:
             for event in pg.event.get():
                 self.on_event(event=event)
+            # kilka kroków symulacji na jedną narysowaną klatkę
+            for _ in range(timestep.advance()):
+                self.on_loop()
+            if timestep.should_render():
+                self.on_render()
+            timestep.wait()
+        # statystyki listy sąsiadów raz, na koniec, zamiast w tytule okna
+        self.show_neighbor_stats()
+        self.on_cleanup()
+
+    def run_headless(self, ticks: int = HEADLESS_TICKS) -> float:
+        # bez okna i bez czekania na klatki: liczymy tak szybko, jak pozwala procesor
+        self.on_init()
+        start = time.perf_counter()
+        for _ in range(ticks):
             self.on_loop()
-            self.on_render()
+            if self._paused:
+                break
+        elapsed = time.perf_counter() - start
+        steps_per_second = self.tick_count / elapsed if elapsed > 0 else 0.0
+        print(
+            f"{self.tick_count} kroków, {len(self.boids)} boidów, "
+            f"{elapsed:.2f} s, {steps_per_second:.1f} kroków/s"
+        )
+        self.show_neighbor_stats()
         self.on_cleanup()
+        return steps_per_second
 
 
 def main() -> None:
-    sim = Simulation()
-    sim.on_execute()
+    parser = argparse.ArgumentParser(description="boids")
+    parser.add_argument("--boids", type=int, default=BOIDS_NUM)
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="licz siły całego stada naraz w tablicach NumPy",
+    )
+    parser.add_argument(
+        "--skin",
+        type=float,
+        default=NEIGHBOR_SKIN,
+        help="zapas promienia listy sąsiadów Verleta, 0 wyłącza listę",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="bez okna, tyle kroków ile się da, na koniec wypisz kroki/s",
+    )
+    parser.add_argument("--ticks", type=int, default=HEADLESS_TICKS)
+    parser.add_argument(
+        "--tick-rate",
+        type=float,
+        default=TICK_RATE,
+        help="kroki symulacji na sekundę, niezależnie od rysowania",
+    )
+    parser.add_argument("--fps", type=float, default=FRAME_RATE)
+    parser.add_argument(
+        "--fast-forward",
+        type=int,
+        metavar="N",
+        help="licz bez limitu i rysuj co N-ty krok",
+    )
+    parser.add_argument(
+        "--dirty-rects",
+        action="store_true",
+        help="rysuj i odświeżaj na ekranie tylko zmienione obszary",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        nargs=2,
+        default=(500, 500),
+        metavar=("WIDTH", "HEIGHT"),
+        help="granice świata w pikselach",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="ziarno losowości dla powtarzalnych przebiegów",
+    )
+    args = parser.parse_args()
+    sim = Simulation(
+        boids_num=args.boids,
+        vectorized=args.vectorized,
+        neighbor_skin=args.skin,
+        headless=args.headless,
+        world_size=tuple(args.size),
+        tick_rate=None if args.fast_forward else args.tick_rate,
+        frame_rate=args.fps,
+        render_every=args.fast_forward or 1,
+        dirty_rects=args.dirty_rects,
+        seed=args.seed,
+    )
+    if args.headless:
+        sim.run_headless(ticks=args.ticks)
+    else:
+        sim.on_execute()
 
 
 if __name__ == "__main__":
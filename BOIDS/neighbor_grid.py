@@ -0,0 +1,95 @@
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pygame as pg
+
+# przesunięcia do komórek 3x3 wokół komórki boida (łącznie z nią samą)
+NEIGHBOR_OFFSETS: Tuple[Tuple[int, int], ...] = tuple(
+    (dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+)
+
+
+class NeighborGrid:
+    def __init__(self, world_size: Tuple[int, int], cell_size: float) -> None:
+        self.world_size = world_size
+        self.cell_size = cell_size
+        width, height = world_size
+        # świat się odbija, więc pozycja może być równa szerokości/wysokości;
+        # ostatnia komórka obejmuje też sam brzeg
+        self.columns: int = max(1, int(np.ceil(width / cell_size)))
+        self.rows: int = max(1, int(np.ceil(height / cell_size)))
+        self.cells: List[list] = [[] for _ in range(self.columns * self.rows)]
+
+    def cell_of(self, position: pg.Vector2) -> Tuple[int, int]:
+        column = min(max(int(position[0] // self.cell_size), 0), self.columns - 1)
+        row = min(max(int(position[1] // self.cell_size), 0), self.rows - 1)
+        return column, row
+
+    def rebuild(self, sprites: Iterable[pg.sprite.Sprite]) -> None:
+        # przebudowa raz na klatkę jest tańsza niż śledzenie każdego ruchu
+        for cell in self.cells:
+            cell.clear()
+        for sprite in sprites:
+            column, row = self.cell_of(sprite.position)
+            self.cells[row * self.columns + column].append(sprite)
+
+    def get_nearby(self, position: pg.Vector2) -> Iterator[pg.sprite.Sprite]:
+        # wszystko z komórek 3x3, czyli każdy w promieniu cell_size
+        column, row = self.cell_of(position)
+        for dx, dy in NEIGHBOR_OFFSETS:
+            c, r = column + dx, row + dy
+            if 0 <= c < self.columns and 0 <= r < self.rows:
+                yield from self.cells[r * self.columns + c]
+
+    def query_radius(
+        self, position: pg.Vector2, radius: float
+    ) -> List[pg.sprite.Sprite]:
+        # promień może być większy niż komórka, wtedy sprawdzamy więcej komórek
+        reach = int(np.ceil(radius / self.cell_size))
+        column, row = self.cell_of(position)
+        found = []
+        for r in range(max(0, row - reach), min(self.rows, row + reach + 1)):
+            for c in range(
+                max(0, column - reach), min(self.columns, column + reach + 1)
+            ):
+                for sprite in self.cells[r * self.columns + c]:
+                    if position.distance_to(sprite.position) < radius:
+                        found.append(sprite)
+        return found
+
+    def candidate_pairs(
+        self, positions: np.ndarray
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        # wersja tablicowa dla Flock: pary (i, j), i != j, z sąsiednich komórek,
+        # po jednym kawałku na każde z dziewięciu przesunięć
+        n = len(positions)
+        columns = np.clip(
+            (positions[:, 0] // self.cell_size).astype(np.intp), 0, self.columns - 1
+        )
+        rows = np.clip(
+            (positions[:, 1] // self.cell_size).astype(np.intp), 0, self.rows - 1
+        )
+        cells = rows * self.columns + columns
+        # sortowanie przez zliczanie: boidy z jednej komórki leżą obok siebie;
+        # stabilny argsort liczb 16-bitowych to w NumPy sortowanie pozycyjne
+        # (dwa przebiegi zliczania), więc O(n) bez porównań
+        keys = cells.astype(np.uint16) if self.columns * self.rows <= 1 << 16 else cells
+        order = np.argsort(keys, kind="stable")
+        counts = np.bincount(cells, minlength=self.columns * self.rows)
+        starts = np.cumsum(counts) - counts
+        observers = np.arange(n)
+
+        for dx, dy in NEIGHBOR_OFFSETS:
+            c, r = columns + dx, rows + dy
+            valid = (c >= 0) & (c < self.columns) & (r >= 0) & (r < self.rows)
+            neighbor_cells = np.where(valid, r * self.columns + c, 0)
+            sizes = np.where(valid, counts[neighbor_cells], 0)
+            total = int(sizes.sum())
+            if total == 0:
+                continue
+            i = np.repeat(observers, sizes)
+            first = np.repeat(starts[neighbor_cells], sizes)
+            within = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            j = order[first + within]
+            keep = i != j
+            yield i[keep], j[keep]
@@ -0,0 +1,77 @@
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from neighbor_grid import NeighborGrid
+
+
+class NeighborList:
+    def __init__(
+        self, world_size: Tuple[int, int], radius: float, skin: float
+    ) -> None:
+        self.radius = radius
+        # zapas ponad promień sąsiedztwa, dzięki któremu lista
+        # pozostaje poprawna przez kilka klatek
+        self.skin = skin
+        self.grid = NeighborGrid(world_size=world_size, cell_size=radius + skin)
+        # pary (i, j) w odległości mniejszej niż radius + skin
+        self.pairs: Tuple[np.ndarray, np.ndarray] = (
+            np.empty(0, dtype=np.intp),
+            np.empty(0, dtype=np.intp),
+        )
+        self.reference_positions: Optional[np.ndarray] = None
+        # liczniki do strojenia wielkości skin
+        self.rebuild_count: int = 0
+        self.step_count: int = 0
+
+    @property
+    def rebuild_ratio(self) -> float:
+        return self.rebuild_count / self.step_count if self.step_count else 0.0
+
+    def needs_rebuild(self, positions: np.ndarray) -> bool:
+        # zmiana liczby boidów przestawia indeksy, więc lista jest nieważna
+        if (
+            self.reference_positions is None
+            or len(positions) != len(self.reference_positions)
+        ):
+            return True
+        moved = positions - self.reference_positions
+        max_moved_sq = np.einsum("ij,ij->i", moved, moved).max(initial=0.0)
+        # dwa boidy mogą zbliżyć się do siebie o dwa przesunięcia
+        return max_moved_sq > (self.skin / 2) ** 2
+
+    def update(self, positions: np.ndarray) -> bool:
+        self.step_count += 1
+        if not self.needs_rebuild(positions):
+            return False
+        self.rebuild(positions)
+        return True
+
+    def rebuild(self, positions: np.ndarray) -> None:
+        reach_sq = (self.radius + self.skin) ** 2
+        pairs_i, pairs_j = [], []
+        for i, j in self.grid.candidate_pairs(positions):
+            offsets = positions[j] - positions[i]
+            close = np.einsum("ij,ij->i", offsets, offsets) < reach_sq
+            pairs_i.append(i[close])
+            pairs_j.append(j[close])
+        if pairs_i:
+            self.pairs = (np.concatenate(pairs_i), np.concatenate(pairs_j))
+        else:
+            self.pairs = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+        self.reference_positions = positions.copy()
+        self.rebuild_count += 1
+
+    def candidate_pairs(
+        self, positions: np.ndarray
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        # ten sam interfejs co NeighborGrid.candidate_pairs, ale z pamięcią
+        self.update(positions)
+        yield self.pairs
+
+    def neighbors_of_each(self, count: int) -> List[np.ndarray]:
+        # lista kandydatów osobno dla każdego boida (dla ścieżki sprite'owej)
+        i, j = self.pairs
+        order = np.argsort(i, kind="stable")
+        bounds = np.cumsum(np.bincount(i, minlength=count))[:-1]
+        return np.split(j[order], bounds)
@@ -0,0 +1,37 @@
+import math
+
+import numpy as np
+import pygame as pg
+
+
+class PerceptionCone:
+    def __init__(self, perception: float) -> None:
+        self.perception = perception
+        # cel jest widoczny, gdy kąt między kierunkiem a wektorem do celu
+        # jest mniejszy niż połowa pola widzenia, czyli gdy
+        # cos(kąta) = heading·offset / |offset| > cos(perception / 2);
+        # cosinus liczymy raz, a per kandydat wystarczy iloczyn skalarny
+        self.cos_half: float = math.cos(math.radians(perception / 2))
+
+    @staticmethod
+    def heading_from_angle(angle: float) -> pg.Vector2:
+        # wektor jednostkowy dla kąta w stopniach (jak last_rotation_angle)
+        radians = math.radians(angle)
+        return pg.Vector2(math.cos(radians), math.sin(radians))
+
+    @staticmethod
+    def headings_from_angles(angles: np.ndarray) -> np.ndarray:
+        radians = np.radians(angles)
+        return np.stack((np.cos(radians), np.sin(radians)), axis=-1)
+
+    def contains(
+        self, heading: pg.Vector2, offset: pg.Vector2, distance: float
+    ) -> bool:
+        return heading.dot(offset) > self.cos_half * distance
+
+    def contains_many(
+        self, headings: np.ndarray, offsets: np.ndarray, distances: np.ndarray
+    ) -> np.ndarray:
+        # to samo dla tablic: wiersz i to jedna para (obserwator, cel)
+        dots = np.einsum("ij,ij->i", headings, offsets)
+        return dots > self.cos_half * distances
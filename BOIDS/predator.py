@@ -1,11 +1,16 @@
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
 import pygame as pg
+from perception import PerceptionCone
+from random_source import RandomSource
 from vehicle import Vehicle
 
 from boids import Boid
 
+if TYPE_CHECKING:
+    from flock import Flock
+
 
 class Predator(Vehicle):
     MAX_ATTACK_SPEED = 2.1
@@ -20,6 +25,7 @@ class Predator(Vehicle):
     max_speed = MAX_NORMAL_SPEED
     # kąt obserwacji
     perception = 120
+    perception_cone = PerceptionCone(perception)
     # promień sąsiedzctwa
     neighborhood_radius = 300
     # waga wyrównania
@@ -40,29 +46,29 @@ class Predator(Vehicle):
     base_color: Tuple[int, int, int] = (0, 239, 255)
     attack_color: Tuple[int, int, int] = (255, 0, 0)
 
-    def __init__(self) -> None:
-        super().__init__(color=self.base_color, max_speed=self.max_speed)
+    def __init__(
+        self,
+        world_size: Optional[Tuple[int, int]] = None,
+        random_source: Optional[RandomSource] = None,
+    ) -> None:
+        super().__init__(
+            color=self.base_color,
+            max_speed=self.max_speed,
+            world_size=world_size,
+            random_source=random_source,
+        )
         # inicjalizacja listy boidów
         self.boids = []
+        self.flock: Optional[Flock] = None
 
     def update(self) -> None:
         self.update_color()
         super().update(self.pursue(), self.max_acceleration)
 
     def update_color(self) -> None:
-        self.original_image.fill((0, 0, 0, 0))
-        if self.attack:
-            pg.gfxdraw.filled_polygon(
-                self.original_image,
-                self.TRIANGLE_POINTS,
-                self.attack_color,
-            )
-        else:
-            pg.gfxdraw.filled_polygon(
-                self.original_image,
-                self.TRIANGLE_POINTS,
-                self.base_color,
-            )
+        color = self.attack_color if self.attack else self.base_color
+        if color != self.color:
+            self.set_color(color)
 
     def pursue(self) -> pg.Vector2:
         if self.attack:
@@ -78,41 +84,34 @@ class Predator(Vehicle):
 
     def find_nearest_boid(self) -> pg.Vector2:
         separation_force = pg.Vector2(0, 0)
-        cached_angle_rad = np.radians(self.last_rotation_angle)
-        perception_half = np.radians(self.perception / 2)
         distance_min = np.inf
         if not self.boids:
             # brak boidów, brak akcji
             return pg.Vector2(0, 0)
-        for boid in self.boids:
-            distance_to_boid = self.position.distance_to(boid.position)
-            if distance_to_boid < distance_min:
-                distance_min = distance_to_boid
-                self.closest_boid = boid
+        if self.flock is not None and self.flock.count:
+            # stado ma pozycje w jednej tablicy, szukamy od razu po wszystkich
+            index, distance_min = self.flock.nearest(self.position)
+            self.closest_boid = self.flock.boids[index]
+        else:
+            for boid in self.boids:
+                distance_to_boid = self.position.distance_to(boid.position)
+                if distance_to_boid < distance_min:
+                    distance_min = distance_to_boid
+                    self.closest_boid = boid
         if self.closest_boid is None:
             # brak najbliższego boida, nie robimy nic
             return pg.Vector2(0, 0)
         if distance_min < self.neighborhood_radius:
-            angle_to_boid = np.arctan2(
-                self.closest_boid.position.y - self.position.y,
-                self.closest_boid.position.x - self.position.x,
-            )
-            # obliczamy różnicę między kątami (w radianach)
-            angle_diff = np.abs(cached_angle_rad - angle_to_boid)
-
-            # sprawdzamy różnicę kątów, jeśli jest większa niż 180,
-            #  to zmniejszamy ją
-            if angle_diff > np.pi:
-                angle_diff = 2 * np.pi - angle_diff
+            direction = self.closest_boid.position - self.position
             # sprawdzamy, czy boid jest w zasięgu percepcji
-            if angle_diff < perception_half:
+            if self.perception_cone.contains(self.heading, direction, distance_min):
                 # jeśli odległość jest mniejsza niż minimalna,
                 # obliczamy siłę separacji i używamy jej z przeciwnym
                 # znakiem by nasz predator podążał za boidami
                 if 0 < abs(distance_min) < self.d_min:
                     separation_strength = self.separation_factor * (
                         (1 - (self.d_min / abs(distance_min)))
-                        * (self.closest_boid.position - self.position)
+                        * direction
                     )
                     separation_force += separation_strength
         # jeśli jesteśmy w trybie ataku to lecimy za najbliższym
@@ -121,16 +120,11 @@ class Predator(Vehicle):
             separation_force
             if self.attack
             else pg.Vector2(
-                np.random.uniform(
-                    low=-5,
-                    high=5,
-                ),
-                np.random.uniform(
-                    low=-5,
-                    high=5,
-                ),
+                self.random_source.uniform(-5, 5),
+                self.random_source.uniform(-5, 5),
             )
         )
 
-    def set_prey(self, boids: List[Boid]) -> None:
+    def set_prey(self, boids: List[Boid], flock: Optional["Flock"] = None) -> None:
         self.boids = boids
+        self.flock = flock
@@ -0,0 +1,56 @@
+import bisect
+from typing import Optional, Sequence, Tuple, TypeVar, Union
+
+import numpy as np
+
+T = TypeVar("T")
+
+# ile liczb losujemy naraz do wydawania pojedynczo
+BLOCK_SIZE = 1 << 16
+
+
+class RandomSource:
+    def __init__(
+        self, seed: Optional[int] = None, block_size: int = BLOCK_SIZE
+    ) -> None:
+        # osobny generator na symulację, więc ten sam seed daje ten sam przebieg
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        # pojedyncze wywołanie NumPy ma duży stały koszt, więc losujemy
+        # cały blok i wydajemy liczby z listy Pythona
+        self._block: list = []
+        self._index: int = 0
+
+    def random(self) -> float:
+        # liczba z przedziału [0, 1)
+        if self._index == len(self._block):
+            self._block = self.generator.random(self.block_size).tolist()
+            self._index = 0
+        value = self._block[self._index]
+        self._index += 1
+        return value
+
+    def uniform(self, low: float, high: float) -> float:
+        return low + (high - low) * self.random()
+
+    def integers(self, low: int, high: int) -> int:
+        # liczba całkowita z przedziału [low, high)
+        return low + int((high - low) * self.random())
+
+    def choice(self, options: Sequence[T], p: Optional[Sequence[float]] = None) -> T:
+        if p is None:
+            return options[int(len(options) * self.random())]
+        # odwracanie dystrybuanty zamiast np.random.choice(p=...)
+        cumulative = np.cumsum(p).tolist()
+        index = bisect.bisect_right(cumulative, self.random() * cumulative[-1])
+        return options[min(index, len(options) - 1)]
+
+    def uniform_array(
+        self, low: float, high: float, size: Union[int, Tuple[int, ...]]
+    ) -> np.ndarray:
+        # całe tablice (np. dla całej populacji) losujemy od razu
+        return self.generator.uniform(low, high, size)
+
+
+# źródło dla obiektów tworzonych bez jawnie podanego źródła
+DEFAULT_RANDOM = RandomSource()
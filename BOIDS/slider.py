@@ -1,9 +1,9 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
 import pygame as pg
 
 
-class Slider(pg.sprite.Sprite):
+class Slider(pg.sprite.DirtySprite):
     def __init__(
         self,
         position: Tuple[int, int],
@@ -41,6 +41,9 @@ class Slider(pg.sprite.Sprite):
         self.button_rect.centery = self.slider_rect.centery
 
         self.button_grabbed = False
+        # wartość, dla której obrazek jest aktualny (None = jeszcze nie rysowany)
+        self.rendered_value: Optional[float] = None
+        self.font = pg.font.Font(None, 15)
 
     def get_value(self) -> float:
         # wartość suwaka jako przeliczona z pozycji przycisku
@@ -52,13 +55,19 @@ class Slider(pg.sprite.Sprite):
 
     def render_label(self) -> None:
         # rysuj etykietę na górze
-        text = pg.font.Font(None, 15).render(
+        text = self.font.render(
             f"{self.slider_name} {int(self.get_value())}", True, "white"
         )
         text_rect = text.get_rect(center=(self.image.get_width() // 2, 10))
         self.image.blit(text, text_rect)
 
     def update(self) -> None:
+        # przerysowujemy tylko, gdy wartość suwaka się zmieniła
+        value = self.get_value()
+        if value == self.rendered_value:
+            return
+        self.rendered_value = value
+        self.dirty = 1
         # całkowicie wyczyść obraz (cały sprite)
         self.image.fill((0, 0, 0, 0))
         self.render_label()
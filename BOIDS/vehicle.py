@@ -1,49 +1,59 @@
-from typing import Tuple
+import math
+from typing import Optional, Tuple
 
 import numpy as np
 import pygame as pg
-from pygame import Vector2, gfxdraw
+from atlas import ATLAS, IMAGE_SIZE
+from perception import PerceptionCone
+from pygame import Vector2
+from random_source import DEFAULT_RANDOM, RandomSource
 
 
-class Vehicle(pg.sprite.Sprite):
+class Vehicle(pg.sprite.DirtySprite):
+    # bok kwadratowego obrazka z trójkątem
+    image_size = IMAGE_SIZE
 
-    def __init__(self, color: Tuple[int, int, int], max_speed: float) -> None:
+    def __init__(
+        self,
+        color: Tuple[int, int, int],
+        max_speed: float,
+        world_size: Optional[Tuple[int, int]] = None,
+        random_source: Optional[RandomSource] = None,
+    ) -> None:
 
         super().__init__()
-        # pg.SRCALPHA mówi, że ma przezroczystość obrazek
-        self.image: pg.Surface = pg.Surface((15, 15), pg.SRCALPHA)
-        # trójkącik o zadanym kolorze
-        self.TRIANGLE_POINTS = [(15, 5), (0, 2), (0, 8)]
-        gfxdraw.filled_polygon(
-            self.image,
-            self.TRIANGLE_POINTS,
-            pg.Color(*color, 255),
-        )
+        # wspólne źródło losowości symulacji (z ziarnem dla powtarzalności)
+        self.random_source: RandomSource = random_source or DEFAULT_RANDOM
+        # pojazdy ruszają się w każdej klatce, więc zawsze są do przerysowania
+        self.dirty = 2
+        # granice świata; bez nich bierzemy rozmiar okna
+        if world_size is None:
+            world_size = pg.display.get_surface().get_size()
+        self.world_size: Tuple[int, int] = world_size
+        # trójkącik o zadanym kolorze, wspólny dla wszystkich pojazdów
+        self.color: Tuple[int, int, int] = color
+        self.image: pg.Surface = ATLAS.get(color, 0)
         # promień naszego pojazdu, by zderzenia były lepsze
         self.radius: int = self.image.get_width() // 2
         # losowy kąt początkowy
-        self.direction: float = np.random.uniform(
-            low=np.radians(0),
-            high=np.radians(360),
-        )
+        self.direction: float = self.random_source.uniform(0, 2 * math.pi)
         # losowa początkowa pozycja
         self.position: Vector2 = pg.Vector2(
-            x=np.random.uniform(0, pg.display.get_surface().get_width()),
-            y=np.random.uniform(0, pg.display.get_surface().get_height()),
+            x=self.random_source.uniform(0, self.world_size[0]),
+            y=self.random_source.uniform(0, self.world_size[1]),
         )
         # cosinus reprezezntuje x składową wektora, tj.znając kąt wiemy ile
         # się przesunąć wzdłóż iksowej, sinus analogicznie
         self.velocity: Vector2 = pg.Vector2(
-            x=np.cos(self.direction),
-            y=np.sin(self.direction),
+            x=math.cos(self.direction),
+            y=math.sin(self.direction),
         )
 
         self.rect: pg.Rect = self.image.get_rect(center=self.position)
 
-        # cache, bo gra nie wyrabia przerysowując tyle razy trójkąciki
         self.last_rotation_angle: int = 0
-        self.original_image: pg.Surface = self.image.copy()
-        self.angle_cache: dict = {}
+        # wektor jednostkowy kierunku, liczony tylko przy zmianie kąta
+        self.heading: Vector2 = PerceptionCone.heading_from_angle(0)
 
         self.acceleration: pg.Vector2 = Vector2(0, 0)
         self.max_speed: float = max_speed
@@ -86,7 +96,7 @@ class Vehicle(pg.sprite.Sprite):
         self.update_rotation()
 
     def avoid_edge(self) -> None:
-        screen_width, screen_height = pg.display.get_surface().get_size()
+        screen_width, screen_height = self.world_size
 
         # odbijanie jednostek od brzegów ekranu
         if self.position.x < 0:
@@ -119,15 +129,20 @@ class Vehicle(pg.sprite.Sprite):
             )
             # jeśli kąt się zmienił o mniej niż 1 stopień, to nie kręcimy
             if abs(angle - self.last_rotation_angle) > 1:
-                # bez sensu kręcić tyle razy trójkącikiem, mamy cashe
-                if angle not in self.angle_cache:
-                    self.angle_cache[angle] = pg.transform.rotate(
-                        self.original_image, -angle
-                    )
-
-                self.image = self.angle_cache[angle]
+                self.image = self.get_rotated_image(angle)
+                self.last_rotation_angle = angle
+                self.heading = PerceptionCone.heading_from_angle(angle)
             self.rect = self.image.get_rect(center=self.position)
 
+    def get_rotated_image(self, angle: int) -> pg.Surface:
+        # bez sensu kręcić tyle razy trójkącikiem, mamy wspólny atlas
+        return ATLAS.get(self.color, angle)
+
+    def set_color(self, color: Tuple[int, int, int]) -> None:
+        self.color = color
+        self.image = self.get_rotated_image(self.last_rotation_angle)
+        self.rect = self.image.get_rect(center=self.rect.center)
+
     def draw(self, screen: pg.SurfaceType) -> None:
         screen.blit(source=self.image, dest=self.rect)
 
@@ -139,6 +154,6 @@ class Vehicle(pg.sprite.Sprite):
 
     def add_noise(self) -> pg.Vector2:
         return self.disturbance_weight * pg.Vector2(
-            np.sin(np.random.uniform(low=np.radians(0), high=np.radians(360))),
-            np.cos(np.random.uniform(low=np.radians(0), high=np.radians(360))),
+            math.sin(self.random_source.uniform(0, 2 * math.pi)),
+            math.cos(self.random_source.uniform(0, 2 * math.pi)),
         )
@@ -1,16 +1,61 @@
 import colorsys
+from functools import lru_cache
+from itertools import accumulate
 
-import numpy as np
-from creature import Creature
+from creature import Creature, shared_surface
 from consts import FOOD_ENERGY, BUG_MAX_AGE, BUG_MAX_ENERGY
 
+# geny pierwszego pokolenia: siła skłonności do każdego skrętu
+DEFAULT_GENES = {
+    "F": 0.0,
+    "R": 0.0,
+    "HR": 3.0,
+    "RV": 2.0,
+    "HL": -1.0,
+    "L": 3.0,
+}
+
+# odcienie buga od czerwonego (0) do zielonego (33), co 0.01 hue
+HUE_LEVELS = 34
+
+
+def hue_color(level):
+    """Zwraca kolor RGB odcienia o numerze level (hue = level / 100)."""
+    return tuple(int(c * 255) for c in colorsys.hsv_to_rgb(level / 100, 1, 1))
+
+
+@lru_cache(maxsize=4096)
+def turn_distribution(genome):
+    """Liczy dystrybuantę skrętów dla genomu.
+
+    Args:
+        genome (tuple[float, ...]): Wartości genów w kolejności skrętów.
+
+    Returns:
+        tuple[float, ...]: Skumulowane P = 2^i / Σ2^i.
+    """
+    strengths = [2**gene for gene in genome]
+    total = sum(strengths)
+    return tuple(accumulate(strength / total for strength in strengths))
+
 
 class Bug(Creature):
+    spatial_kind = "bug"
 
     mutation_probability = 0.25
+    # wspólne powierzchnie dla każdego odcienia, zamiast własnej na buga
+    hue_surfaces = [shared_surface(hue_color(level)) for level in range(HUE_LEVELS)]
+    world_references = Creature.world_references + (
+        "food_group",
+        "food_layer",
+        "bugs_group",
+        "smell_map",
+    )
     __slots__ = Creature.__slots__ + [
         "genes",
+        "turn_cdf",
         "food_group",
+        "food_layer",
         "bugs_group",
         "smell_map",
     ]
@@ -22,6 +67,10 @@ class Bug(Creature):
         spatial_grid,
         bugs_group,
         smell_map,
+        random_source=None,
+        food_layer=None,
+        world_size=None,
+        life_queue=None,
     ):
         """
         Inicjalizuje nowego buga.
@@ -33,36 +82,76 @@ class Bug(Creature):
             Siatka przestrzenna do zarządzania położeniem.
             bugs_group (pg.sprite.Group): Grupa sprite'ów z innymi bugami.
             smell_map (SmellMap): Mapa zapachu rozprzestrzenianego dyfuzją.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+            food_layer (FoodLayer | None): Jedzenie jako siatka porcji;
+            None oznacza sprite'y Food w food_group.
+            world_size (tuple[int, int] | None): Rozmiar świata w pikselach;
+            None oznacza rozmiar okna.
+            life_queue (LifeQueue | None): Kolejka narodzin i śmierci;
+            None oznacza zmiany od razu.
         """
         super().__init__(
-            position,
-            spatial_grid,
             base_color=(0, 255, 0),
             energy_max=BUG_MAX_ENERGY,
             age_max=BUG_MAX_AGE,
         )
         self.is_bug = True
-        self.food_group = food_group
+        self.reset(
+            position,
+            food_group,
+            spatial_grid,
+            bugs_group,
+            smell_map,
+            random_source,
+            food_layer,
+            world_size,
+            life_queue,
+        )
 
+    def reset(
+        self,
+        position,
+        food_group,
+        spatial_grid,
+        bugs_group,
+        smell_map,
+        random_source=None,
+        food_layer=None,
+        world_size=None,
+        life_queue=None,
+    ):
+        """Ustawia stan nowego buga; argumenty jak w konstruktorze."""
+        self.reset_creature(
+            position,
+            spatial_grid,
+            bugs_group,
+            random_source=random_source,
+            world_size=world_size,
+            life_queue=life_queue,
+        )
+        self.food_group = food_group
+        self.food_layer = food_layer
         self.bugs_group = bugs_group
-        self.bugs_group.add(self)
-
         self.smell_map = smell_map
 
-        self.genes = {
-            "F": 0.0,
-            "R": 0.0,
-            "HR": 3.0,
-            "RV": 2.0,
-            "HL": -1.0,
-            "L": 3.0,
-        }
+        # słownik genów jest współdzielony, mutacja zawsze robi kopię
+        self.set_genes(DEFAULT_GENES)
+        self.join_world()
+
+    def set_genes(self, genes):
+        """Ustawia geny i dystrybuantę skrętów liczoną raz na genom.
+
+        Args:
+            genes (dict[str, float]): Siła genu dla każdego skrętu.
+        """
+        self.genes = genes
+        self.turn_cdf = turn_distribution(tuple(genes[k] for k in self.turns))
 
     def update(self):
-        if not self.alive():
-            return
         self.age_creature()
-        self.do_suicide()
+        if self.do_suicide():
+            # martwe stworzenie nie może wrócić do siatki przy ruchu
+            return
         self.eat_food()
         self.move()
         self.multiply()
@@ -75,42 +164,20 @@ class Bug(Creature):
         # Normalizuj wiek (0.0 = młody, 1.0 = stary)
         normalized_age = min(1.0, self.age / self.age_max)
 
-        # Przejście hue: 0.33 (zielony) → 0.0 (czerwony)
-        hue_shift = (1 - normalized_age) * 0.33
-
-        if (
-            self.current_hue_level is not None
-            and abs(hue_shift - self.current_hue_level) < 0.01
-        ):
+        # Przejście hue: 0.33 (zielony) → 0.0 (czerwony), jeden odcień
+        # na około 9 kroków wieku
+        level = round((1 - normalized_age) * (HUE_LEVELS - 1))
+        if level == self.current_hue_level:
             return
 
-        self.current_hue_level = hue_shift
-
-        # Przekształć RGB na HSV i zmień hue
-        r, g, b = self.base_color
-        h, s, v = colorsys.rgb_to_hsv(r / 255, g / 255, b / 255)
-        new_rgb = colorsys.hsv_to_rgb(hue_shift, s, v)
-        new_color = tuple(int(c * 255) for c in new_rgb)
-
-        self.image.fill(new_color)
+        self.current_hue_level = level
+        self.image = self.hue_surfaces[level]
 
     def move(self):
         """Porusza buga, zmieniając jego kierunek na podstawie genów."""
-        gene_str = {k: 2**v for k, v in self.genes.items()}
-
-        # suma sił
-        total_str = sum(gene_str.values())
-
-        # prawdopodobieństwo jako P = 2^i / Σ2^i
-        probabilities = [gene_str[k] / total_str for k in self.turns]
-
-        # skręt na podstawie prawdopodobieństw
-        turn = np.random.choice(a=self.turns, p=probabilities)
-        angle = self.turn_angles[turn]
-
-        # obrót kierunku
-        rotated_direction = self.direction.rotate(angle)
-        self.move_forward(rotated_direction)
+        # skręt na podstawie prawdopodobieństw zapisanych w genach
+        turn = self.turns[self.random_source.sample_cumulative(self.turn_cdf)]
+        self.turn_and_move(turn)
 
     def eat_food(self):
         """Sprawdza, czy bug może zjeść pobliskie
@@ -118,9 +185,13 @@ class Bug(Creature):
         if self.energy + FOOD_ENERGY > self.energy_max:
             return
 
-        nearby = self.spatial_grid.get_nearby(self)
+        if self.food_layer is not None:
+            if self.food_layer.eat_under(self.rect):
+                self.energy += FOOD_ENERGY
+            return
+
+        nearby_food = self.spatial_grid.get_nearby(self, "food")
         # znajdujemy tylko pierwsze jedzenie który się z nami zderza
-        nearby_food = [s for s in nearby if s in self.food_group]
         target = next(
             (s for s in nearby_food if self.rect.colliderect(s.rect)),
             None,
@@ -134,21 +205,25 @@ class Bug(Creature):
         """Sprawdza, czy bug może się
         rozmnożyć i jeśli tak, tworzy nowego buga."""
         if self.energy >= self.energy_min and self.age >= self.age_min:
-            child = Bug(
-                self.position.copy(),
+            self.energy //= 2
+            genes = self.genes
+            if self.random_source.random() < self.mutation_probability:
+                genes = genes.copy()
+                random_gene = self.random_source.choice(self.turns)
+                genes[random_gene] += self.random_source.choice([-1, 1])
+            child = Bug.spawn(
+                self.life_queue,
+                self.position,
                 self.food_group,
                 self.spatial_grid,
                 self.bugs_group,
                 self.smell_map,
+                self.random_source,
+                self.food_layer,
+                (self.screen_width, self.screen_height),
             )
-            self.energy //= 2
             child.energy = self.energy
-            child.genes = self.genes.copy()
-            if np.random.random() < self.mutation_probability:
-                random_gene = np.random.choice(self.turns)
-                child.genes[random_gene] += np.random.choice([-1, 1])
-            self.spatial_grid.add(child)
-            self.spatial_grid.update(child)
+            child.set_genes(genes)
             self.dirty = 1
 
     def leave_smell(self):
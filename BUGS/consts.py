@@ -10,7 +10,13 @@ FOOD_BASE_SURFACE.fill(pg.Color("red"))
 
 STARTING_PREDATORS = 4
 STARTING_BUGS = 30
-FOOD_INTERVAL = 4
+
+# kroki symulacji i klatki na sekundę liczone niezależnie
+TICK_RATE = 30
+FRAME_RATE = 30
+
+# średnio tyle jedzenia na krok, jak dawny timer co 4 ms przy TICK_RATE
+FOOD_PER_TICK = 1000 / 4 / TICK_RATE
 
 PREDATOR_MAX_AGE = 150
 PREDATOR_MAX_ENERGY = 180
@@ -19,5 +25,17 @@ FOOD_ENERGY = 12
 BUG_MAX_AGE = 300
 BUG_MAX_ENERGY = 100
 
+# zanikanie zapachu w każdym kroku i sposób liczenia dyfuzji
+SMELL_DECAY = 0.99
+SMELL_BACKEND = "stencil"
+# kafelki mapy zapachu (w komórkach) i próg, poniżej którego zasypiają
+SMELL_TILE_SIZE = 16
+SMELL_EPSILON = 1e-3
+# co ile klatek przeliczać rysowaną warstwę zapachu
+SMELL_REFRESH_EVERY = 1
+
+# najwięcej martwych stworzeń jednego rodzaju czekających na ponowne użycie
+CREATURE_POOL_SIZE = 1024
+
 CREATURE_ENERGY_LOSS = 0.15
 CREATURE_AGE_GAIN = 1
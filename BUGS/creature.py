@@ -1,3 +1,6 @@
+import math
+from functools import lru_cache
+
 import pygame as pg
 from consts import (
     CREATURE_AGE_GAIN,
@@ -5,20 +8,64 @@ from consts import (
     CREATURE_ENERGY_LOSS,
     TILE_SIZE,
 )
+from random_source import DEFAULT_RANDOM
+
+
+@lru_cache(maxsize=None)
+def shared_surface(color):
+    """Zwraca wspólną, wypełnioną kolorem powierzchnię stworzenia.
+
+    Stworzenia tylko wskazują tę powierzchnię jako image, więc żadne
+    z nich nie może po niej rysować.
+
+    Args:
+        color (tuple[int, int, int]): Kolor RGB.
+    """
+    surface = CREATURE_BASE_SURFACE.copy()
+    surface.fill(color)
+    return surface
 
 
 class Creature(pg.sprite.DirtySprite):
+    # warstwa w SpatialGrid, ustawiana przez podklasy
+    spatial_kind = None
+    # atrybuty wskazujące obiekty symulacji, czyszczone w puli,
+    # by martwe stworzenie nie trzymało przy życiu starej symulacji
+    world_references = ("spatial_grid", "group", "life_queue", "random_source")
+
+    # skręty wspólne dla wszystkich stworzeń
+    turns = ["F", "R", "HR", "RV", "HL", "L"]
+    turn_angles = {
+        "F": 0,
+        "R": 60,
+        "HR": 120,
+        "RV": 180,
+        "HL": -120,
+        "L": -60,
+    }
+    # skręty jako wielokrotności 60 stopni, w kolejności turns
+    turn_steps = {"F": 0, "R": 1, "HR": 2, "RV": 3, "HL": -2, "L": -1}
+    # wektory jednostkowe kierunków: (0, -1) obrócony o 60 * heading stopni
+    heading_vectors = [
+        (
+            round(math.sin(math.radians(60 * heading)), 12),
+            round(-math.cos(math.radians(60 * heading)), 12),
+        )
+        for heading in range(6)
+    ]
+    # przesunięcie o jeden krok w każdym kierunku
+    move_steps = [(2 * TILE_SIZE * x, 2 * TILE_SIZE * y) for x, y in heading_vectors]
+
     __slots__ = [
         "rect",
         "age",
         "energy",
         "image",
         "position",
-        "direction",
+        "heading",
         "dirty",
         "blendmode",
         "_visible",
-        "move_vector",
         "spatial_grid",
         "base_color",
         "current_hue_level",
@@ -26,75 +73,157 @@ class Creature(pg.sprite.DirtySprite):
         "age_max",
         "energy_min",
         "age_min",
+        "random_source",
+        "screen_width",
+        "screen_height",
+        "group",
+        "life_queue",
+        "dying",
     ]
 
-    def __init__(
+    def __init__(self, base_color, energy_max, age_max):
+        """Przydziela zasoby stworzenia; stan życia ustawia reset_creature.
+
+        Args:
+            base_color (tuple[int, int, int]): Kolor stworzenia.
+            energy_max (float): Maksymalna energia.
+            age_max (int): Wiek, w którym stworzenie umiera.
+        """
+        super().__init__()
+        self.base_color = base_color
+        self.image: pg.Surface = shared_surface(base_color)
+        self.rect: pg.Rect = self.image.get_rect()
+        self.position: pg.Vector2 = pg.Vector2()
+
+        self.energy_max = energy_max
+        self.energy_min = energy_max * 0.6
+        self.age_max = age_max
+        self.age_min = age_max * 0.325
+
+    def reset_creature(
         self,
         position,
         spatial_grid,
-        base_color,
-        energy_max,
-        age_max,
+        group,
         energy=50,
+        random_source=None,
+        world_size=None,
+        life_queue=None,
     ):
-        super().__init__()
-        self.image: pg.Surface = CREATURE_BASE_SURFACE.copy()
-        self.base_color = base_color
-        self.image.fill(base_color)
+        """Ustawia stan nowego życia, także dla stworzenia z puli.
 
-        self.position: pg.Vector2 = position
-        self.rect: pg.Rect = self.image.get_rect(center=self.position)
-        self.direction = pg.Vector2(0, -1).normalize()
-        self.move_vector = pg.Vector2(0, 0)
+        Stworzenie trafia do grupy i siatki dopiero w join_world().
 
-        self.spatial_grid = spatial_grid
-        self.spatial_grid.add(self)
+        Args:
+            position (pg.Vector2): Początkowa pozycja (kopiowana).
+            spatial_grid (SpatialGrid):
+            Siatka przestrzenna do zarządzania położeniem.
+            group (pg.sprite.Group): Grupa stworzeń tego rodzaju.
+            energy (float): Początkowa energia.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+            world_size (tuple[int, int] | None): Rozmiar świata w pikselach;
+            None oznacza rozmiar okna.
+            life_queue (LifeQueue | None): Kolejka narodzin i śmierci;
+            None oznacza zmiany od razu.
+        """
+        # wspólne źródło losowości symulacji (z ziarnem dla powtarzalności)
+        self.random_source = random_source or DEFAULT_RANDOM
+        self.image = shared_surface(self.base_color)
 
-        self.energy_max = energy_max
-        self.energy_min = energy_max * 0.6
-        self.age_max = age_max
-        self.age_min = age_max * 0.325
+        self.position.update(position)
+        self.rect.center = self.position
+        # numer kierunku: ile razy obróciliśmy się o 60 stopni od (0, -1)
+        self.heading = 0
+
+        self.spatial_grid = spatial_grid
+        self.group = group
+        self.life_queue = life_queue
+        self.dying = False
 
         self.energy = energy
         self.age = 0
 
-        self.turns = ["F", "R", "HR", "RV", "HL", "L"]
-        self.turn_angles = {
-            "F": 0,
-            "R": 60,
-            "HR": 120,
-            "RV": 180,
-            "HL": -120,
-            "L": -60,
-        }
-
         self.current_hue_level = None
         self.dirty = 1
 
-        (
-            self.screen_width,
-            self.screen_height,
-        ) = pg.display.get_surface().get_size()
+        if world_size is None:
+            world_size = pg.display.get_surface().get_size()
+        self.screen_width, self.screen_height = world_size
+
+    @classmethod
+    def spawn(cls, life_queue, *args, **kwargs):
+        """Tworzy stworzenie, biorąc martwe z puli kolejki, jeśli jakieś czeka.
+
+        Args:
+            life_queue (LifeQueue | None): Kolejka narodzin i śmierci
+            z pulą martwych stworzeń; None oznacza zmiany od razu i brak puli.
+            *args, **kwargs: Pozostałe argumenty konstruktora podklasy.
+        """
+        creature = life_queue.pool.take(cls) if life_queue is not None else None
+        if creature is None:
+            return cls(*args, life_queue=life_queue, **kwargs)
+        creature.reset(*args, life_queue=life_queue, **kwargs)
+        return creature
+
+    def join_world(self):
+        """Dodaje stworzenie do grupy i siatki albo zapisuje narodziny."""
+        if self.life_queue is not None:
+            self.life_queue.births.append(self)
+            return
+        self.spatial_grid.add(self)
+        self.group.add(self)
+
+    def die(self):
+        """Usuwa stworzenie ze świata.
+
+        Z kolejką śmierć jest tylko zapisywana, a stworzenie zostaje
+        w grupie i siatce do końca kroku z flagą dying.
+        """
+        if self.dying:
+            return
+        self.dying = True
+        if self.life_queue is not None:
+            self.life_queue.deaths.append(self)
+            return
+        self.leave_world()
+
+    def leave_world(self):
+        """Usuwa stworzenie z siatki i ze wszystkich grup."""
+        self.spatial_grid.remove(self)
+        self.kill()
 
     def age_creature(self):
         """Zmniejsza energię i zwiększa wiek."""
         self.energy -= CREATURE_ENERGY_LOSS
         self.age += CREATURE_AGE_GAIN
 
-    def move_forward(self, direction_vector):
-        """Przesuwa stworzenie w podanym kierunku."""
-        self.move_vector = direction_vector * 2 * TILE_SIZE
-        new_position = self.position + self.move_vector
-        new_position.x %= self.screen_width
-        new_position.y %= self.screen_height
-        self.position = new_position
-        self.rect.center = self.position
-        self.direction = direction_vector.normalize()
+    @property
+    def direction(self):
+        """Wektor jednostkowy aktualnego kierunku."""
+        return pg.Vector2(self.heading_vectors[self.heading])
+
+    def move_forward(self, heading):
+        """Przesuwa stworzenie o krok w kierunku o podanym numerze."""
+        self.heading = heading
+        step_x, step_y = self.move_steps[heading]
+        position = self.position
+        position.x = (position.x + step_x) % self.screen_width
+        position.y = (position.y + step_y) % self.screen_height
+        self.rect.center = position
         self.dirty = 1
         self.spatial_grid.update(self)
 
+    def turn_and_move(self, turn):
+        """Skręca o podany skręt i przesuwa stworzenie."""
+        self.move_forward((self.heading + self.turn_steps[turn]) % 6)
+
     def do_suicide(self):
-        """Usuwa stworzenie, jeśli zbyt stare lub bez energii."""
+        """Usuwa stworzenie, jeśli zbyt stare lub bez energii.
+
+        Returns:
+            bool: Czy stworzenie umarło.
+        """
         if self.energy <= 0.5 or self.age >= self.age_max:
-            self.spatial_grid.remove(self)
-            self.kill()
+            self.die()
+            return True
+        return False
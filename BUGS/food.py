@@ -1,29 +1,137 @@
-import numpy as np
+from collections import Counter
+
 import pygame as pg
-from consts import FOOD_BASE_SURFACE, TILE_SIZE
+from consts import FOOD_BASE_SURFACE, FOOD_PER_TICK, TILE_SIZE
+from random_source import DEFAULT_RANDOM
 
 
 class Food(pg.sprite.DirtySprite):
-    def __init__(self, spatial_grid):
+    spatial_kind = "food"
+
+    def __init__(
+        self, spatial_grid, random_source=None, position=None, add_to_grid=True
+    ):
+        """
+        Args:
+            spatial_grid (SpatialGrid): Siatka przestrzenna jedzenia.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+            position (tuple[float, float] | None): Gotowa pozycja porcji;
+            None oznacza losową komórkę na ekranie.
+            add_to_grid (bool): Czy od razu dodać porcję do siatki.
+        """
         super().__init__()
         self.is_food = True
-        screen = pg.display.get_surface()
-        width, height = screen.get_width(), screen.get_height()
-        x = (
-            round(np.random.randint(0, width) / TILE_SIZE) * TILE_SIZE
-            + TILE_SIZE / 2
-            + 1
-        )
-        y = (
-            round(np.random.randint(0, height) / TILE_SIZE) * TILE_SIZE
-            + TILE_SIZE / 2
-            + 1
-        )
-        self.position = pg.Vector2(x, y)
+        if position is None:
+            random_source = random_source or DEFAULT_RANDOM
+            screen = pg.display.get_surface()
+            width, height = screen.get_width(), screen.get_height()
+            x = (
+                round(random_source.integers(0, width) / TILE_SIZE) * TILE_SIZE
+                + TILE_SIZE / 2
+                + 1
+            )
+            y = (
+                round(random_source.integers(0, height) / TILE_SIZE) * TILE_SIZE
+                + TILE_SIZE / 2
+                + 1
+            )
+            position = (x, y)
+        self.position = pg.Vector2(position)
         self.image = FOOD_BASE_SURFACE.copy()
         self.image.fill(pg.Color("red"))
         self.rect = self.image.get_rect(center=self.position)
         self.spatial_grid = spatial_grid
         self.dirty = 1
         self.visible = 1
-        self.spatial_grid.add(self)
+        if add_to_grid:
+            self.spatial_grid.add(self)
+
+    @classmethod
+    def spawn_many(cls, count, width, height, spatial_grid, random_source=None):
+        """Tworzy naraz wiele porcji, losując pozycje jednym wywołaniem.
+
+        Args:
+            count (int): Liczba nowych porcji.
+            width, height (int): Rozmiar świata w pikselach.
+            spatial_grid (SpatialGrid): Siatka, do której trafia jedzenie.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+
+        Returns:
+            list[Food]: Nowe porcje, już dodane do siatki.
+        """
+        random_source = random_source or DEFAULT_RANDOM
+        xs = random_source.integers_array(0, width, count) / TILE_SIZE
+        ys = random_source.integers_array(0, height, count) / TILE_SIZE
+        offset = TILE_SIZE / 2 + 1
+        xs = xs.round() * TILE_SIZE + offset
+        ys = ys.round() * TILE_SIZE + offset
+        foods = [
+            cls(spatial_grid, position=position, add_to_grid=False)
+            for position in zip(xs.tolist(), ys.tolist())
+        ]
+        spatial_grid.add_many(foods)
+        return foods
+
+
+class FoodSpawner:
+    """Wydaje jedzenie co krok symulacji zamiast co tyknięcie zegara.
+
+    Liczba porcji w kroku ma rozkład Poissona o średniej rate, więc podaż
+    jedzenia nie zależy od tego, jak szybko kręci się pętla.
+    """
+
+    def __init__(self, rate=FOOD_PER_TICK, random_source=None):
+        """
+        Args:
+            rate (float): Średnia liczba porcji na krok.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+        """
+        self.rate = rate
+        self.random_source = random_source or DEFAULT_RANDOM
+
+    def tick(self):
+        """Zwraca liczbę porcji do dodania w tym kroku."""
+        if self.rate <= 0:
+            return 0
+        return self.random_source.poisson(self.rate)
+
+
+class FoodGroup(pg.sprite.Group):
+    """Grupa jedzenia rysowana z trwałej warstwy zamiast sprite po sprite'cie.
+
+    Jedzenie się nie rusza, więc warstwa zmienia się tylko przy dodaniu
+    lub zjedzeniu porcji, a draw() to jeden blit na klatkę.
+    """
+
+    def __init__(self, size, *sprites):
+        """
+        Args:
+            size (tuple[int, int]): Rozmiar świata w pikselach.
+            *sprites (Food): Początkowe porcje.
+        """
+        self.layer = pg.Surface(size)
+        # czarne tło warstwy jest przezroczyste przy blicie
+        self.layer.set_colorkey((0, 0, 0))
+        # kilka porcji może leżeć w jednym miejscu
+        self.stacked = Counter()
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        key = sprite.rect.topleft
+        if not self.stacked[key]:
+            self.layer.blit(sprite.image, sprite.rect)
+        self.stacked[key] += 1
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        key = sprite.rect.topleft
+        self.stacked[key] -= 1
+        if not self.stacked[key]:
+            del self.stacked[key]
+            self.layer.fill((0, 0, 0), sprite.rect)
+
+    def draw(self, surface):
+        """Nakłada warstwę jedzenia na powierzchnię jednym blitem."""
+        surface.blit(self.layer, (0, 0))
+        return []
@@ -0,0 +1,120 @@
+import numpy as np
+import pygame as pg
+from consts import TILE_SIZE
+from random_source import DEFAULT_RANDOM
+
+
+class FoodLayer:
+    """Jedzenie jako siatka liczby porcji zamiast tysięcy sprite'ów.
+
+    Porcje leżą na tej samej siatce co Food: komórka k ma środek w pikselu
+    k * TILE_SIZE + TILE_SIZE / 2 + 1.
+    """
+
+    def __init__(self, width, height, random_source=None):
+        """
+        Args:
+            width (int): Szerokość świata w pikselach.
+            height (int): Wysokość świata w pikselach.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+        """
+        self.width = width
+        self.height = height
+        self.random_source = random_source or DEFAULT_RANDOM
+        # round(randint(0, width) / TILE_SIZE) sięga width / TILE_SIZE
+        self.counts = np.zeros(
+            (height // TILE_SIZE + 2, width // TILE_SIZE + 2), dtype=np.int32
+        )
+        self.color = pg.Color("red")
+
+    @staticmethod
+    def cell_center(cells):
+        """Zwraca piksel środka komórek jedzenia."""
+        return cells * TILE_SIZE + TILE_SIZE // 2 + 1
+
+    def total(self):
+        """Zwraca liczbę wszystkich porcji."""
+        return int(self.counts.sum())
+
+    def spawn(self, count=1):
+        """Dodaje porcje w losowych komórkach, jak konstruktor Food.
+
+        Args:
+            count (int): Liczba nowych porcji.
+        """
+        xs = self.random_source.integers_array(0, self.width, count)
+        ys = self.random_source.integers_array(0, self.height, count)
+        cells_x = np.round(xs / TILE_SIZE).astype(np.intp)
+        cells_y = np.round(ys / TILE_SIZE).astype(np.intp)
+        np.add.at(self.counts, (cells_y, cells_x), 1)
+
+    def eat_under(self, rect):
+        """Zjada jedną porcję, której piksel leży w prostokącie.
+
+        Args:
+            rect (pg.Rect): Prostokąt stworzenia.
+
+        Returns:
+            bool: Czy coś zostało zjedzone.
+        """
+        rows, columns = self.counts.shape
+        # komórki, których środek mieści się w [left, right)
+        offset = TILE_SIZE // 2 + 1
+        left = max(0, -(-(rect.left - offset) // TILE_SIZE))
+        right = min(columns, (rect.right - 1 - offset) // TILE_SIZE + 1)
+        top = max(0, -(-(rect.top - offset) // TILE_SIZE))
+        bottom = min(rows, (rect.bottom - 1 - offset) // TILE_SIZE + 1)
+        if left >= right or top >= bottom:
+            return False
+        area = self.counts[top:bottom, left:right]
+        occupied = np.flatnonzero(area)
+        if not len(occupied):
+            return False
+        row, column = divmod(int(occupied[0]), right - left)
+        area[row, column] -= 1
+        return True
+
+    def eat_many(self, centers, half):
+        """Zjada naraz po jednej porcji pod wieloma kwadratami.
+
+        Args:
+            centers (np.ndarray): Tablica (n, 2) całkowitych środków.
+            half (int): Połowa boku kwadratu (bok to 2 * half + 1).
+
+        Returns:
+            np.ndarray: Indeksy kwadratów, które coś zjadły; o jedną
+            porcję wygrywa kwadrat o niższym indeksie.
+        """
+        rows, columns = self.counts.shape
+        reach = np.arange(-(half // TILE_SIZE) - 1, half // TILE_SIZE + 1)
+        candidates = []
+        for axis, limit in ((0, columns), (1, rows)):
+            pixel = centers[:, axis, None]
+            cells = pixel // TILE_SIZE + reach
+            inside = np.abs(self.cell_center(cells) - pixel) <= half
+            valid = inside & (cells >= 0) & (cells < limit)
+            candidates.append((cells.clip(0, limit - 1), valid))
+        (cells_x, valid_x), (cells_y, valid_y) = candidates
+        # (kwadrat, komórka y, komórka x) spłaszczone do (kwadrat, k)
+        count = len(centers)
+        flat = cells_y[:, :, None] * columns + cells_x[:, None, :]
+        flat = flat.reshape(count, -1)
+        valid = (valid_y[:, :, None] & valid_x[:, None, :]).reshape(count, -1)
+        food = self.counts.reshape(-1)
+        occupied = valid & (food[flat] > 0)
+        fed = np.flatnonzero(occupied.any(axis=1))
+        chosen = flat[fed, occupied[fed].argmax(axis=1)]
+        cells, first = np.unique(chosen, return_index=True)
+        food[cells] -= 1
+        return fed[first]
+
+    def render(self, surface):
+        """Wpisuje piksele jedzenia wprost do powierzchni."""
+        cells_y, cells_x = np.nonzero(self.counts)
+        xs = self.cell_center(cells_x)
+        ys = self.cell_center(cells_y)
+        width, height = surface.get_size()
+        inside = (xs < width) & (ys < height)
+        pixels = pg.surfarray.pixels2d(surface)
+        pixels[xs[inside], ys[inside]] = surface.map_rgb(self.color)
+        del pixels
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from consts import CREATURE_POOL_SIZE
+
+
+class CreaturePool:
+    """Martwe stworzenia czekające na ponowne użycie, osobno dla rodzajów.
+
+    Pula należy do jednej symulacji, a odłożone stworzenia nie trzymają
+    odwołań do jej obiektów (grup, siatki, mapy zapachu).
+    """
+
+    def __init__(self, max_size=CREATURE_POOL_SIZE):
+        """
+        Args:
+            max_size (int): Najwięcej stworzeń jednego rodzaju w puli.
+        """
+        self.max_size = max_size
+        self.free = defaultdict(list)
+
+    def take(self, cls):
+        """Zwraca martwe stworzenie danej klasy albo None."""
+        free = self.free[cls]
+        return free.pop() if free else None
+
+    def release(self, creature):
+        """Odkłada martwe stworzenie, jeśli w puli jest jeszcze miejsce."""
+        free = self.free[type(creature)]
+        if len(free) >= self.max_size:
+            return
+        for name in creature.world_references:
+            setattr(creature, name, None)
+        free.append(creature)
+
+    def clear(self):
+        """Opróżnia pulę."""
+        self.free.clear()
+
+
+class LifeQueue:
+    """Narodziny i śmierci stworzeń zapisane w trakcie kroku.
+
+    Podczas update() grupy i siatka się nie zmieniają: nowe i martwe
+    stworzenia czekają w kolejce, a apply() na końcu kroku wprowadza
+    wszystkie zmiany naraz.
+    """
+
+    def __init__(self, spatial_grid, pool_size=CREATURE_POOL_SIZE):
+        """
+        Args:
+            spatial_grid (SpatialGrid): Siatka wspólna dla stworzeń.
+            pool_size (int): Najwięcej martwych stworzeń jednego rodzaju
+            czekających na ponowne użycie.
+        """
+        self.spatial_grid = spatial_grid
+        self.pool = CreaturePool(pool_size)
+        self.births = []
+        self.deaths = []
+
+    def apply(self):
+        """Usuwa martwe i dodaje nowe stworzenia do grup i siatki."""
+        deaths, self.deaths = self.deaths, []
+        births, self.births = self.births, []
+
+        for creature in deaths:
+            creature.leave_world()
+            # do puli dopiero teraz, by nikt nie użył jej w tym kroku
+            self.pool.release(creature)
+
+        self.spatial_grid.add_many(births)
+        groups = defaultdict(list)
+        for creature in births:
+            groups[creature.group].append(creature)
+        for group, members in groups.items():
+            group.add(*members)
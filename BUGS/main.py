@@ -1,72 +1,159 @@
-import numpy as np
+import argparse
+
 import pygame as pg
 from bug import Bug
-from consts import FOOD_INTERVAL, STARTING_BUGS, STARTING_PREDATORS, TILE_SIZE
-from food import Food
+from consts import (
+    FOOD_PER_TICK,
+    FRAME_RATE,
+    SMELL_REFRESH_EVERY,
+    STARTING_BUGS,
+    STARTING_PREDATORS,
+    TICK_RATE,
+    TILE_SIZE,
+)
+from food import Food, FoodGroup, FoodSpawner
+from food_layer import FoodLayer
+from life_queue import LifeQueue
+from population import Population
 from predator import Predator
-from smell_map import SmellMap
+from random_source import RandomSource
+from smell_map import SmellMap, TiledSmellMap
 from spatial_grid import SpatialGrid
+from timestep import FixedTimestep
 
 
 class Simulation:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        tick_rate=TICK_RATE,
+        frame_rate=FRAME_RATE,
+        render_every=1,
+        seed=None,
+        tiled_smell=False,
+        smell_refresh=SMELL_REFRESH_EVERY,
+        vectorized=False,
+        bugs_num=STARTING_BUGS,
+        predators_num=STARTING_PREDATORS,
+        food_layer=False,
+        food_per_tick=FOOD_PER_TICK,
+    ) -> None:
+        """
+        Args:
+            tick_rate (float | None): Kroki symulacji na sekundę;
+            None oznacza przewijanie bez limitu.
+            frame_rate (float): Klatki na sekundę.
+            render_every (int): Co ile kroków rysować przy przewijaniu.
+            seed (int | None): Ziarno losowości dla powtarzalnych przebiegów.
+            tiled_smell (bool): Liczy dyfuzję zapachu tylko na aktywnych
+            kafelkach (opłacalne na dużych mapach).
+            smell_refresh (int): Co ile klatek przeliczać warstwę zapachu.
+            vectorized (bool): Liczy populację na tablicach (Population)
+            zamiast na sprite'ach.
+            bugs_num (int): Początkowa liczba bugów.
+            predators_num (int): Początkowa liczba predatorów.
+            food_layer (bool): Trzyma jedzenie w siatce porcji (FoodLayer)
+            zamiast w sprite'ach Food.
+            food_per_tick (float): Średnia liczba nowych porcji na krok.
+        """
+        self.tick_rate = tick_rate
+        self.frame_rate = frame_rate
+        self.render_every = render_every
+        self.seed = seed
+        self.tiled_smell = tiled_smell
+        self.smell_refresh = smell_refresh
+        self.vectorized = vectorized
+        self.bugs_num = bugs_num
+        self.predators_num = predators_num
+        self.use_food_layer = food_layer
+        self.food_per_tick = food_per_tick
+        self.random_source = RandomSource(seed)
+        self.food_spawner = FoodSpawner(food_per_tick, self.random_source)
         self._running = True
         self._display_surf = None
         self._paused = False
         self.size = self.width, self.height = 501, 501
-        self.food_event = pg.USEREVENT + 1
         self.spatial_grid = SpatialGrid(
             self.size[0],
             self.size[1],
             TILE_SIZE * 3,
         )
-        self.food_group = pg.sprite.Group()
+        # narodziny i śmierci stosowane na końcu każdego kroku
+        self.life_queue = LifeQueue(self.spatial_grid)
+        self.food_group = FoodGroup(self.size)
         self.bugs_group = pg.sprite.Group()
         self.predators_group = pg.sprite.Group()
-        self.clock = None
         self.background = None
 
-        self.smell_map = SmellMap(self.width, self.height)
+        smell_map_class = TiledSmellMap if tiled_smell else SmellMap
+        self.smell_map = smell_map_class(
+            self.width,
+            self.height,
+            refresh_every=smell_refresh,
+        )
+        self.food_layer = None
+        if food_layer and not vectorized:
+            self.food_layer = FoodLayer(
+                self.width, self.height, self.random_source
+            )
+        self.population = None
+        if vectorized:
+            self.population = Population(
+                self.width,
+                self.height,
+                self.smell_map,
+                random_source=self.random_source,
+            )
 
     def populate(self):
         """Tworzy początkową populację jedzenia i bugów."""
-        for _ in range(round(self.width * 10)):
-            food = Food(spatial_grid=self.spatial_grid)
-            self.food_group.add(food)
-        for _ in range(STARTING_BUGS):
-            Bug(
+        if self.vectorized:
+            self.population.populate(
+                self.bugs_num,
+                self.predators_num,
+                round(self.width * 10),
+            )
+            return
+        self.spawn_food(round(self.width * 10))
+        for _ in range(self.bugs_num):
+            Bug.spawn(
+                self.life_queue,
                 position=pg.math.Vector2(
                     (
-                        np.random.random() * self.width,
-                        np.random.random() * self.height,
+                        self.random_source.random() * self.width,
+                        self.random_source.random() * self.height,
                     )
                 ),
                 food_group=self.food_group,
                 spatial_grid=self.spatial_grid,
                 bugs_group=self.bugs_group,
                 smell_map=self.smell_map,
+                random_source=self.random_source,
+                food_layer=self.food_layer,
+                world_size=self.size,
             )
-        for _ in range(STARTING_PREDATORS):
-            Predator(
+        for _ in range(self.predators_num):
+            Predator.spawn(
+                self.life_queue,
                 position=pg.math.Vector2(
                     (
-                        np.random.random() * self.width,
-                        np.random.random() * self.height,
+                        self.random_source.random() * self.width,
+                        self.random_source.random() * self.height,
                     )
                 ),
                 spatial_grid=self.spatial_grid,
                 bugs_group=self.bugs_group,
                 predators_group=self.predators_group,
                 smell_map=self.smell_map,
+                random_source=self.random_source,
+                world_size=self.size,
             )
+        self.life_queue.apply()
 
     def on_init(self) -> None:
         """Inicjalizuje Pygame i zasoby symulacji."""
 
         pg.init()
 
-        pg.time.set_timer(self.food_event, FOOD_INTERVAL)
-
         self._display_surf = pg.display.set_mode(
             size=self.size,
             vsync=1,
@@ -75,15 +162,33 @@ class Simulation:
         self.background.fill((0, 0, 0))
         pg.display.set_caption("BUGS LIFE (1998)")
 
-        self.clock = pg.time.Clock()
         self._running = True
         self.populate()
         return True
 
-    def spawn_food(self) -> None:
-        """Tworzy i dodaje nowe jedzenie."""
-        new_food = Food(spatial_grid=self.spatial_grid)
-        self.food_group.add(new_food)
+    def spawn_food(self, count=1) -> None:
+        """Tworzy i dodaje nowe jedzenie.
+
+        Args:
+            count (int): Liczba nowych porcji.
+        """
+        if count <= 0:
+            return
+        if self.vectorized:
+            self.population.spawn_food(count)
+            return
+        if self.food_layer is not None:
+            self.food_layer.spawn(count)
+            return
+        self.food_group.add(
+            Food.spawn_many(
+                count,
+                self.width,
+                self.height,
+                self.spatial_grid,
+                self.random_source,
+            )
+        )
 
     def on_event(self, event) -> None:
         """Obsługuje zdarzenia Pygame."""
@@ -91,28 +196,54 @@ class Simulation:
             self._running = False
         if event.type == pg.KEYDOWN and self._paused:
             if event.key == pg.K_r:
-                self.__init__()
+                self.__init__(
+                    tick_rate=self.tick_rate,
+                    frame_rate=self.frame_rate,
+                    render_every=self.render_every,
+                    seed=self.seed,
+                    tiled_smell=self.tiled_smell,
+                    smell_refresh=self.smell_refresh,
+                    vectorized=self.vectorized,
+                    bugs_num=self.bugs_num,
+                    predators_num=self.predators_num,
+                    food_layer=self.use_food_layer,
+                    food_per_tick=self.food_per_tick,
+                )
                 self.on_init()
-        if event.type == self.food_event and not self._paused:
-            self.spawn_food()
 
     def on_loop(self) -> None:
         """Aktualizuje logikę symulacji."""
-        self.bugs_group.update()
-        self.predators_group.update()
+        if not self._paused:
+            # jedzenie przybywa co krok, a nie co tyknięcie zegara
+            self.spawn_food(self.food_spawner.tick())
+        if self.vectorized:
+            self.population.step()
+            bugs_alive = self.population.bugs.count > 0
+        else:
+            self.bugs_group.update()
+            # zapach dla wszystkich predatorów jednym odczytem siatki
+            Predator.sense_smell(self.predators_group.sprites(), self.smell_map)
+            self.predators_group.update()
+            self.life_queue.apply()
+            bugs_alive = bool(self.bugs_group)
 
         self.smell_map.diffuse()
 
-        if not self.bugs_group.sprites() and not self._paused:
+        if not bugs_alive and not self._paused:
             self._paused = True
 
     def on_render(self) -> None:
         """Rysuje elementy symulacji na ekranie."""
         self._display_surf.fill((0, 0, 0))
         self.smell_map.render(self._display_surf)
-        self.food_group.draw(surface=self._display_surf)
-        self.bugs_group.draw(surface=self._display_surf)
-        self.predators_group.draw(surface=self._display_surf)
+        if self.vectorized:
+            self.population.render(self._display_surf)
+        else:
+            if self.food_layer is not None:
+                self.food_layer.render(self._display_surf)
+            self.food_group.draw(surface=self._display_surf)
+            self.bugs_group.draw(surface=self._display_surf)
+            self.predators_group.draw(surface=self._display_surf)
         if self._paused:
             font = pg.font.SysFont(None, 36)
             text = font.render(
@@ -130,7 +261,6 @@ class Simulation:
             )
             self._display_surf.blit(text, text_rect)
         pg.display.update()
-        self.clock.tick(30)
 
     def on_cleanup(self) -> None:
         pg.quit()
@@ -139,16 +269,87 @@ class Simulation:
         """Główna pętla symulacji."""
         if self.on_init() is False:
             self._running = False
+        timestep = FixedTimestep(
+            tick_rate=self.tick_rate,
+            frame_rate=self.frame_rate,
+            render_every=self.render_every,
+        )
         while self._running:
             for event in pg.event.get():
                 self.on_event(event=event)
-            self.on_loop()
-            self.on_render()
+            # kilka kroków symulacji na jedną narysowaną klatkę
+            for _ in range(timestep.advance()):
+                self.on_loop()
+            if timestep.should_render():
+                self.on_render()
+            timestep.wait()
         self.on_cleanup()
 
 
 def main() -> None:
-    sim = Simulation()
+    parser = argparse.ArgumentParser(description="BUGS LIFE (1998)")
+    parser.add_argument(
+        "--tick-rate",
+        type=float,
+        default=TICK_RATE,
+        help="kroki symulacji na sekundę, niezależnie od rysowania",
+    )
+    parser.add_argument("--fps", type=float, default=FRAME_RATE)
+    parser.add_argument(
+        "--fast-forward",
+        type=int,
+        metavar="N",
+        help="licz bez limitu i rysuj co N-ty krok",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="ziarno losowości dla powtarzalnych przebiegów",
+    )
+    parser.add_argument(
+        "--tiled-smell",
+        action="store_true",
+        help="dyfuzja zapachu tylko na aktywnych kafelkach",
+    )
+    parser.add_argument(
+        "--smell-refresh",
+        type=int,
+        default=SMELL_REFRESH_EVERY,
+        metavar="N",
+        help="przeliczaj warstwę zapachu co N klatek",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="licz populację na tablicach NumPy zamiast na sprite'ach",
+    )
+    parser.add_argument("--bugs", type=int, default=STARTING_BUGS)
+    parser.add_argument("--predators", type=int, default=STARTING_PREDATORS)
+    parser.add_argument(
+        "--food-layer",
+        action="store_true",
+        help="jedzenie jako siatka porcji zamiast sprite'ów",
+    )
+    parser.add_argument(
+        "--food-per-tick",
+        type=float,
+        default=FOOD_PER_TICK,
+        help="średnia liczba nowych porcji jedzenia na krok symulacji",
+    )
+    args = parser.parse_args()
+    sim = Simulation(
+        tick_rate=None if args.fast_forward else args.tick_rate,
+        frame_rate=args.fps,
+        render_every=args.fast_forward or 1,
+        seed=args.seed,
+        tiled_smell=args.tiled_smell,
+        smell_refresh=args.smell_refresh,
+        vectorized=args.vectorized,
+        bugs_num=args.bugs,
+        predators_num=args.predators,
+        food_layer=args.food_layer,
+        food_per_tick=args.food_per_tick,
+    )
     sim.on_execute()
 
 
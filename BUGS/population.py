@@ -0,0 +1,357 @@
+import numpy as np
+from bug import DEFAULT_GENES, HUE_LEVELS, Bug
+from consts import (
+    BUG_MAX_AGE,
+    BUG_MAX_ENERGY,
+    CREATURE_AGE_GAIN,
+    CREATURE_ENERGY_LOSS,
+    FOOD_ENERGY,
+    PREDATOR_MAX_AGE,
+    PREDATOR_MAX_ENERGY,
+    TILE_SIZE,
+)
+from creature import Creature, shared_surface
+from food_layer import FoodLayer
+from predator import Predator
+from random_source import DEFAULT_RANDOM
+from spatial_grid import ArrayGrid
+
+# przesunięcie o krok dla każdego numeru kierunku
+MOVE_STEPS = np.array(Creature.move_steps)
+UNIT_STEPS = np.array(Creature.heading_vectors)
+# bok kwadratu stworzenia w pikselach (jak CREATURE_BASE_SURFACE)
+CREATURE_SIZE = TILE_SIZE * 3 - 1
+
+
+class CreatureArrays:
+    """Stan jednego rodzaju stworzeń w ciągłych tablicach NumPy.
+
+    Wiersz k opisuje k-te żywe stworzenie, martwe są usuwane przez
+    zagęszczenie tablic na koniec każdej fazy.
+    """
+
+    def __init__(self, energy_max, age_max, with_genes=False, capacity=1024):
+        """
+        Args:
+            energy_max (float): Maksymalna energia.
+            age_max (int): Wiek, w którym stworzenie umiera.
+            with_genes (bool): Czy przechowywać geny skrętów.
+            capacity (int): Początkowy rozmiar tablic.
+        """
+        self.energy_max = energy_max
+        self.energy_min = energy_max * 0.6
+        self.age_max = age_max
+        self.age_min = age_max * 0.325
+        self.with_genes = with_genes
+        self.count = 0
+        self.positions = np.zeros((capacity, 2), dtype=np.float64)
+        self.headings = np.zeros(capacity, dtype=np.intp)
+        self.energy = np.zeros(capacity, dtype=np.float64)
+        self.age = np.zeros(capacity, dtype=np.int64)
+        if with_genes:
+            turns = len(Creature.turns)
+            self.genes = np.zeros((capacity, turns), dtype=np.float64)
+            self.turn_cdf = np.zeros((capacity, turns), dtype=np.float64)
+
+    def fields(self):
+        """Zwraca nazwy tablic z wierszem na stworzenie."""
+        names = ["positions", "headings", "energy", "age"]
+        if self.with_genes:
+            names += ["genes", "turn_cdf"]
+        return names
+
+    def add(self, positions, energy, genes=None):
+        """Dopisuje nowe stworzenia na koniec tablic.
+
+        Args:
+            positions (np.ndarray): Tablica (k, 2) pozycji.
+            energy (np.ndarray): Energia początkowa każdego stworzenia.
+            genes (np.ndarray | None): Tablica (k, 6) genów.
+        """
+        added = len(positions)
+        if not added:
+            return
+        start, stop = self.count, self.count + added
+        if stop > len(self.positions):
+            self._grow(stop)
+        self.positions[start:stop] = positions
+        self.headings[start:stop] = 0
+        self.energy[start:stop] = energy
+        self.age[start:stop] = 0
+        if self.with_genes:
+            self.genes[start:stop] = genes
+            # ta sama dystrybuanta co turn_distribution w Bug
+            strengths = np.exp2(genes)
+            cumulative = np.cumsum(strengths, axis=1)
+            self.turn_cdf[start:stop] = cumulative / cumulative[:, -1:]
+        self.count = stop
+
+    def keep(self, mask):
+        """Zostawia tylko stworzenia zaznaczone w masce.
+
+        Args:
+            mask (np.ndarray): Maska długości count.
+        """
+        kept = int(mask.sum())
+        if kept == self.count:
+            return
+        for name in self.fields():
+            array = getattr(self, name)
+            array[:kept] = array[: self.count][mask]
+        self.count = kept
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self.positions))
+        for name in self.fields():
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def age_and_die(self):
+        """Starzeje stworzenia i usuwa zbyt stare lub bez energii."""
+        n = self.count
+        self.energy[:n] -= CREATURE_ENERGY_LOSS
+        self.age[:n] += CREATURE_AGE_GAIN
+        self.keep((self.energy[:n] > 0.5) & (self.age[:n] < self.age_max))
+
+    def step_forward(self, movers, turns, width, height):
+        """Skręca wybrane stworzenia i przesuwa je o krok.
+
+        Args:
+            movers (np.ndarray): Indeksy poruszanych stworzeń.
+            turns (np.ndarray): Indeks skrętu dla każdego z nich.
+            width, height (int): Rozmiar świata do zawijania pozycji.
+        """
+        headings = (self.headings[movers] + turns) % 6
+        self.headings[movers] = headings
+        positions = self.positions[movers] + MOVE_STEPS[headings]
+        np.mod(positions[:, 0], width, out=positions[:, 0])
+        np.mod(positions[:, 1], height, out=positions[:, 1])
+        self.positions[movers] = positions
+
+    def ready_to_multiply(self):
+        """Zwraca indeksy gotowych do rozmnażania i dzieli ich energię."""
+        n = self.count
+        ready = np.flatnonzero(
+            (self.energy[:n] >= self.energy_min) & (self.age[:n] >= self.age_min)
+        )
+        self.energy[ready] //= 2
+        return ready
+
+    def pixel_positions(self):
+        """Zwraca pozycje zaokrąglone jak środek pg.Rect."""
+        return np.floor(self.positions[: self.count] + 0.5).astype(np.intp)
+
+
+class Population:
+    """Silnik symulacji bugów i predatorów na tablicach.
+
+    Każda faza (starzenie, jedzenie, ruch, rozmnażanie, zapach) jest
+    jednym przebiegiem po tablicach zamiast wywołań update() sprite'ów.
+    Sprite'y nie istnieją, render() rysuje stworzenia po indeksach.
+    """
+
+    def __init__(self, width, height, smell_map, random_source=None):
+        """
+        Args:
+            width, height (int): Rozmiar świata w pikselach.
+            smell_map (SmellMap): Mapa zapachu rozprzestrzenianego dyfuzją.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+        """
+        self.width = width
+        self.height = height
+        self.smell_map = smell_map
+        self.random_source = random_source or DEFAULT_RANDOM
+        self.bugs = CreatureArrays(BUG_MAX_ENERGY, BUG_MAX_AGE, with_genes=True)
+        self.predators = CreatureArrays(PREDATOR_MAX_ENERGY, PREDATOR_MAX_AGE)
+        self.food = FoodLayer(width, height, self.random_source)
+        self.default_genes = np.array(
+            [DEFAULT_GENES[turn] for turn in Creature.turns], dtype=np.float64
+        )
+        # te same wspólne powierzchnie, których używają sprite'y
+        self.bug_surfaces = Bug.hue_surfaces
+        self.predator_surface = shared_surface((0, 0, 255))
+        # siatki przebudowywane raz na krok z tablic pozycji: bugi do
+        # kolizji z predatorami, predatory do sprawdzania tłoku
+        self.bug_grid = ArrayGrid(width, height, CREATURE_SIZE)
+        self.predator_grid = ArrayGrid(width, height, TILE_SIZE * 3)
+
+    def populate(self, bugs_num, predators_num, food_num):
+        """Tworzy początkową populację jedzenia, bugów i predatorów."""
+        self.spawn_food(food_num)
+        size = np.array((self.width, self.height), dtype=np.float64)
+        self.bugs.add(
+            self.random_source.random_array((bugs_num, 2)) * size,
+            50,
+            np.tile(self.default_genes, (bugs_num, 1)),
+        )
+        self.predators.add(
+            self.random_source.random_array((predators_num, 2)) * size, 50
+        )
+
+    def spawn_food(self, count=1):
+        """Dodaje porcje jedzenia w losowych komórkach."""
+        self.food.spawn(count)
+
+    def step(self):
+        """Wykonuje jeden krok symulacji dla całej populacji."""
+        self.step_bugs()
+        self.step_predators()
+
+    def step_bugs(self):
+        bugs = self.bugs
+        bugs.age_and_die()
+        if not bugs.count:
+            return
+        self.bugs_eat()
+        self.bugs_move()
+        self.bugs_multiply()
+        self.bugs_leave_smell()
+
+    def bugs_eat(self):
+        """Każdy głodny bug zjada jedną porcję spod swojego prostokąta."""
+        bugs = self.bugs
+        n = bugs.count
+        hungry = np.flatnonzero(bugs.energy[:n] + FOOD_ENERGY <= bugs.energy_max)
+        if not len(hungry):
+            return
+        pixels = bugs.pixel_positions()[hungry]
+        eaters = hungry[self.food.eat_many(pixels, CREATURE_SIZE // 2)]
+        bugs.energy[eaters] += FOOD_ENERGY
+
+    def bugs_move(self):
+        """Losuje skręt każdego buga z jego dystrybuanty genów."""
+        bugs = self.bugs
+        n = bugs.count
+        cdf = bugs.turn_cdf[:n]
+        draws = self.random_source.random_array(n)[:, None] * cdf[:, -1:]
+        # odpowiednik bisect_right dla każdego wiersza
+        turns = np.minimum((cdf <= draws).sum(axis=1), cdf.shape[1] - 1)
+        bugs.step_forward(np.arange(n), turns, self.width, self.height)
+
+    def bugs_multiply(self):
+        bugs = self.bugs
+        ready = bugs.ready_to_multiply()
+        if not len(ready):
+            return
+        genes = bugs.genes[ready].copy()
+        mutated = np.flatnonzero(
+            self.random_source.random_array(len(ready)) < Bug.mutation_probability
+        )
+        gene = self.random_source.integers_array(0, genes.shape[1], len(mutated))
+        sign = self.random_source.integers_array(0, 2, len(mutated)) * 2 - 1
+        genes[mutated, gene] += sign
+        bugs.add(bugs.positions[ready], bugs.energy[ready], genes)
+
+    def bugs_leave_smell(self):
+        positions = self.bugs.positions[: self.bugs.count].astype(np.intp)
+        self.smell_map.add_smell_sources(positions[:, 0], positions[:, 1], 1.0)
+
+    def step_predators(self):
+        predators = self.predators
+        predators.age_and_die()
+        if not predators.count:
+            return
+        self.predators_eat()
+        self.predators_move()
+        ready = predators.ready_to_multiply()
+        predators.add(predators.positions[ready], predators.energy[ready])
+
+    def predators_eat(self):
+        """Głodne predatory zjadają pierwszego dotykanego buga."""
+        predators = self.predators
+        bugs = self.bugs
+        n = predators.count
+        hungry = np.flatnonzero(
+            predators.energy[:n] + Predator.bug_sustenance <= predators.energy_max
+        )
+        if not len(hungry) or not bugs.count:
+            return
+        # prostokąty CREATURE_SIZE x CREATURE_SIZE nachodzą na siebie,
+        # gdy środki różnią się o mniej niż bok
+        hunters = predators.pixel_positions()[hungry]
+        bug_pixels = bugs.pixel_positions()
+        self.bug_grid.rebuild(bug_pixels)
+        hunter, prey = self.bug_grid.pairs_nearby(hunters)
+        delta = np.abs(hunters[hunter] - bug_pixels[prey])
+        touching = (delta[:, 0] < CREATURE_SIZE) & (delta[:, 1] < CREATURE_SIZE)
+        hunter, prey = hunter[touching], prey[touching]
+        if not len(hunter):
+            return
+        order = np.lexsort((prey, hunter))
+        hunter, prey = hunter[order], prey[order]
+        # pierwszy bug dla każdego predatora, potem jeden predator na buga
+        hunter, first = np.unique(hunter, return_index=True)
+        prey, first = np.unique(prey[first], return_index=True)
+        hunter = hunter[first]
+        predators.energy[hungry[hunter]] += Predator.bug_sustenance
+
+        cells = (bugs.positions[prey] // TILE_SIZE).astype(np.intp)
+        grid = self.smell_map.grid
+        inside = (cells[:, 0] < grid.shape[1]) & (cells[:, 1] < grid.shape[0])
+        grid[cells[inside, 1], cells[inside, 0]] = 0
+
+        alive = np.ones(bugs.count, dtype=bool)
+        alive[prey] = False
+        bugs.keep(alive)
+
+    def predators_move(self):
+        """Porusza predatory za zapachem, losowo gdy tłoczno lub pusto."""
+        predators = self.predators
+        n = predators.count
+        positions = predators.positions[:n]
+        headings = predators.headings[:n]
+        turns_count = len(Creature.turns)
+
+        # ilu innych predatorów jest w komórkach 3x3 (jak SpatialGrid)
+        self.predator_grid.rebuild(positions)
+        crowded = self.predator_grid.count_nearby(positions) - 1 > 3
+
+        smell_cells = (positions // TILE_SIZE).astype(np.intp)
+        best, best_smell = Predator.best_turns(
+            smell_cells[:, 0], smell_cells[:, 1], headings, self.smell_map.grid
+        )
+        turns = best.copy()
+        turns[crowded] = self.random_source.integers_array(
+            0, turns_count, int(crowded.sum())
+        )
+
+        # bez zapachu: do sześciu losowych prób wejścia na wolne pole
+        wander = np.flatnonzero(~crowded & (best_smell <= 0))
+        tries = self.random_source.integers_array(0, turns_count, (len(wander), 6))
+        steps = UNIT_STEPS[(headings[wander, None] + tries) % 6]
+        targets = positions[wander, None, :] + steps
+        free = (
+            (targets[..., 0] >= 0)
+            & (targets[..., 0] < self.width // TILE_SIZE)
+            & (targets[..., 1] >= 0)
+            & (targets[..., 1] < self.height // TILE_SIZE)
+        )
+        turns[wander] = tries[np.arange(len(wander)), free.argmax(axis=1)]
+
+        moving = np.ones(n, dtype=bool)
+        moving[wander[~free.any(axis=1)]] = False
+        movers = np.flatnonzero(moving)
+        predators.step_forward(movers, turns[movers], self.width, self.height)
+
+    def render(self, surface):
+        """Rysuje jedzenie i stworzenia po indeksach, bez sprite'ów."""
+        self.food.render(surface)
+
+        half = CREATURE_SIZE // 2
+        bugs = self.bugs
+        normalized_age = np.minimum(1.0, bugs.age[: bugs.count] / bugs.age_max)
+        levels = np.round((1 - normalized_age) * (HUE_LEVELS - 1)).astype(np.intp)
+        corners = (bugs.pixel_positions() - half).tolist()
+        surfaces = self.bug_surfaces
+        surface.blits(
+            [
+                (surfaces[level], corner)
+                for level, corner in zip(levels.tolist(), corners)
+            ],
+            doreturn=False,
+        )
+        corners = (self.predators.pixel_positions() - half).tolist()
+        image = self.predator_surface
+        surface.blits([(image, corner) for corner in corners], doreturn=False)
@@ -5,13 +5,47 @@ from creature import Creature
 from smell_map import SmellMap
 
 
+def build_smell_offsets():
+    """Liczy przesunięcia komórek, z których predator próbkuje zapach.
+
+    Returns:
+        np.ndarray: Tablica (kierunek, skręt, próbka, xy) z przesunięciami
+        dla próbek wprost oraz o 30 stopni w prawo i w lewo od skrętu.
+    """
+    offsets = np.zeros((6, 6, 3, 2), dtype=np.intp)
+    for heading in range(6):
+        for turn in range(6):
+            for sample, spread in enumerate((0, 30, -30)):
+                vec = pg.Vector2(0, -1).rotate(60 * (heading + turn) + spread)
+                # obcinamy do int jak wcześniej, bez dryfu obrotów
+                offsets[heading, turn, sample] = (
+                    int(round(vec.x, 6)),
+                    int(round(vec.y, 6)),
+                )
+    return offsets
+
+
 class Predator(Creature):
+    spatial_kind = "predator"
     bug_sustenance = 35
+    smell_offsets = build_smell_offsets()
+    # komórki (dx, dy) czytane przy próbkowaniu, dla każdego kierunku
+    smell_cells = [
+        frozenset(map(tuple, offsets.reshape(-1, 2).tolist()))
+        for offsets in smell_offsets
+    ]
+    world_references = Creature.world_references + (
+        "bugs_group",
+        "predators_group",
+        "smell_map",
+    )
 
     __slots__ = Creature.__slots__ + [
         "bugs_group",
         "predators_group",
         "smell_map",
+        "smell_turn",
+        "best_smell",
     ]
 
     def __init__(
@@ -21,6 +55,9 @@ class Predator(Creature):
         bugs_group,
         predators_group,
         smell_map,
+        random_source=None,
+        world_size=None,
+        life_queue=None,
     ):
         """
         Inicjalizuje nowego predatora.
@@ -32,95 +69,152 @@ class Predator(Creature):
             bugs_group (pg.sprite.Group): Grupa sprite'ów z bugami.
             predators_group (pg.sprite.Group): Grupa sprite'ów z predatorami.
             smell_map (SmellMap): Mapa zapachu rozprzestrzenianego dyfuzją.
+            random_source (RandomSource | None): Źródło losowości symulacji.
+            world_size (tuple[int, int] | None): Rozmiar świata w pikselach;
+            None oznacza rozmiar okna.
+            life_queue (LifeQueue | None): Kolejka narodzin i śmierci;
+            None oznacza zmiany od razu.
 
         """
         super().__init__(
-            position,
-            spatial_grid,
             base_color=(0, 0, 255),
             energy_max=PREDATOR_MAX_ENERGY,
             age_max=PREDATOR_MAX_AGE,
         )
+        self.reset(
+            position,
+            spatial_grid,
+            bugs_group,
+            predators_group,
+            smell_map,
+            random_source,
+            world_size,
+            life_queue,
+        )
 
+    def reset(
+        self,
+        position,
+        spatial_grid,
+        bugs_group,
+        predators_group,
+        smell_map,
+        random_source=None,
+        world_size=None,
+        life_queue=None,
+    ):
+        """Ustawia stan nowego predatora; argumenty jak w konstruktorze."""
+        self.reset_creature(
+            position,
+            spatial_grid,
+            predators_group,
+            random_source=random_source,
+            world_size=world_size,
+            life_queue=life_queue,
+        )
         self.bugs_group = bugs_group
-
         self.predators_group = predators_group
-        self.predators_group.add(self)
 
         self.smell_map: SmellMap = smell_map
-
-        (
-            self.screen_width,
-            self.screen_height,
-        ) = pg.display.get_surface().get_size()
+        # wynik próbkowania zapachu: indeks skrętu i siła (None = brak)
+        self.smell_turn = None
+        self.best_smell = 0.0
+        self.join_world()
 
     def update(self):
-        if not self.alive():
-            return
         self.age_creature()
-        self.do_suicide()
+        if self.do_suicide():
+            # martwe stworzenie nie może wrócić do siatki przy ruchu
+            return
         self.eat_bug()
         self.move()
         self.multiply()
 
-    def move(self):
-        """Porusza predatora, zmieniając jego kierunek na podstawie zapachu."""
+    @classmethod
+    def best_turns(cls, gx, gy, headings, grid):
+        """Wybiera najlepiej pachnący skręt dla tablic predatorów.
 
-        best_smell, best_turn = -1.0, None
-        gx = int(self.position.x // TILE_SIZE)
-        gy = int(self.position.y // TILE_SIZE)
-        grid = self.smell_map.grid
+        Args:
+            gx, gy (np.ndarray): Komórki siatki zapachu predatorów.
+            headings (np.ndarray): Numery kierunków predatorów.
+            grid (np.ndarray): Siatka zapachu.
 
-        for turn in self.turns:
-            vec = self.direction.rotate(self.turn_angles[turn])
-            coords = [
-                (gx + int(vec.x), gy + int(vec.y)),
-                (
-                    gx + int(self.direction.rotate(self.turn_angles[turn] + 30).x),
-                    gy + int(self.direction.rotate(self.turn_angles[turn] + 30).y),
-                ),
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Indeks skrętu i jego zapach.
+        """
+        height, width = grid.shape
+        # (predator, skręt, próbka, xy)
+        offsets = cls.smell_offsets[headings]
+        xs = gx[:, None, None] + offsets[..., 0]
+        ys = gy[:, None, None] + offsets[..., 1]
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        samples = grid[ys.clip(0, height - 1), xs.clip(0, width - 1)]
+        smell = np.where(inside, samples, 0).sum(axis=2)
+        # argmax bierze pierwszy najlepszy skręt, jak wcześniejsza pętla
+        best = smell.argmax(axis=1)
+        return best, smell[np.arange(len(best)), best]
+
+    @classmethod
+    def sense_smell(cls, predators, smell_map):
+        """Próbkuje zapach dla wielu predatorów jednym odczytem siatki.
+
+        Args:
+            predators (list[Predator]): Predatory do sprawdzenia.
+            smell_map (SmellMap): Mapa zapachu.
+        """
+        if not predators:
+            return
+        cells = np.array(
+            [
                 (
-                    gx + int(self.direction.rotate(self.turn_angles[turn] - 30).x),
-                    gy + int(self.direction.rotate(self.turn_angles[turn] - 30).y),
-                ),
-            ]
-            smell = sum(
-                grid[y][x]
-                for x, y in coords
-                if 0 <= x < grid.shape[1] and 0 <= y < grid.shape[0]
-            )
-            if smell > best_smell:
-                best_smell, best_turn = smell, turn
+                    int(p.position.x // TILE_SIZE),
+                    int(p.position.y // TILE_SIZE),
+                    p.heading,
+                )
+                for p in predators
+            ],
+            dtype=np.intp,
+        )
+        best, best_smell = cls.best_turns(
+            cells[:, 0], cells[:, 1], cells[:, 2], smell_map.grid
+        )
+        for predator, turn, value in zip(
+            predators, best.tolist(), best_smell.tolist()
+        ):
+            predator.smell_turn = turn
+            predator.best_smell = value
+
+    def move(self):
+        """Porusza predatora, zmieniając jego kierunek na podstawie zapachu."""
+        if self.smell_turn is None:
+            Predator.sense_smell([self], self.smell_map)
+        best_smell = self.best_smell
+        best_turn = self.turns[self.smell_turn]
+        self.smell_turn = None
 
-        nearby = self.spatial_grid.get_nearby(self)
-        num_neighbors = sum(1 for s in nearby if s in self.predators_group)
+        num_neighbors = self.spatial_grid.count_nearby(self, "predator")
 
         if num_neighbors > 3:
             # Jest zbyt tłoczno — losowo zmień kierunek, by się rozproszyć
-            angle = self.turn_angles[np.random.choice(self.turns)]
-            new_dir = self.direction.rotate(angle)
-            self.move_forward(new_dir)
+            self.turn_and_move(self.random_source.choice(self.turns))
             return
 
         if best_smell <= 0:
             # Szukamy losowego ruchu prowadzącego do wolnej przestrzeni
             for _ in range(6):
-                turn = np.random.choice(self.turns)
-                angle = self.turn_angles[turn]
-                new_dir = self.direction.rotate(angle)
-                new_pos = self.position + new_dir
+                turn = self.random_source.choice(self.turns)
+                heading = (self.heading + self.turn_steps[turn]) % 6
+                step_x, step_y = self.heading_vectors[heading]
                 if (
-                    0 <= new_pos.x < self.screen_width // TILE_SIZE
-                    and 0 <= new_pos.y < self.screen_height // TILE_SIZE
+                    0 <= self.position.x + step_x < self.screen_width // TILE_SIZE
+                    and 0 <= self.position.y + step_y < self.screen_height // TILE_SIZE
                 ):
-                    self.move_forward(new_dir)
+                    self.turn_and_move(turn)
                     return
             # Nie udało się znaleźć dobrego kierunku
             return
         else:
-            angle = self.turn_angles[best_turn]
-            new_dir = self.direction.rotate(angle)
-            self.move_forward(new_dir)
+            self.turn_and_move(best_turn)
 
     def eat_bug(self):
         """Sprawdza, czy predator może zjeść pobliskiego buga
@@ -128,16 +222,18 @@ class Predator(Creature):
         if self.energy + self.bug_sustenance > self.energy_max:
             return
 
-        nearby = self.spatial_grid.get_nearby(self)
-        # znajdujemy tylko pierwszego buga, który się z nami zderza
-        nearby_bugs = [s for s in nearby if s in self.bugs_group]
+        nearby_bugs = self.spatial_grid.get_nearby(self, "bug")
+        # znajdujemy tylko pierwszego żywego buga, który się z nami zderza
         target = next(
-            (s for s in nearby_bugs if self.rect.colliderect(s.rect)),
+            (
+                s
+                for s in nearby_bugs
+                if not s.dying and self.rect.colliderect(s.rect)
+            ),
             None,
         )
         if target:
-            self.spatial_grid.remove(target)
-            target.kill()
+            target.die()
             self.energy += self.bug_sustenance
             gx = int(target.position.x // TILE_SIZE)
             gy = int(target.position.y // TILE_SIZE)
@@ -147,20 +243,40 @@ class Predator(Creature):
                 and 0 <= gy < self.smell_map.grid.shape[0]
             ):
                 self.smell_map.grid[gy][gx] = 0
+                self.forget_smell_at(gx, gy)
+
+    def forget_smell_at(self, gx, gy):
+        """Kasuje próbki zapachu, które czytały wyzerowaną komórkę.
+
+        sense_smell próbkuje wszystkich predatorów przed ich ruchem, więc
+        predator, którego próbki objęły komórkę, próbkuje ponownie w move(),
+        jak wtedy, gdy każdy czytał zapach po jedzeniu poprzednich.
+
+        Args:
+            gx, gy (int): Wyzerowana komórka siatki zapachu.
+        """
+        for predator in self.predators_group:
+            if predator.smell_turn is None:
+                continue
+            dx = gx - int(predator.position.x // TILE_SIZE)
+            dy = gy - int(predator.position.y // TILE_SIZE)
+            if (dx, dy) in self.smell_cells[predator.heading]:
+                predator.smell_turn = None
 
     def multiply(self) -> None:
         """Sprawdza, czy predator może się
         rozmnożyć i jeśli tak, tworzy nowego predatora."""
         if self.energy >= self.energy_min and self.age >= self.age_min:
-            child = Predator(
-                self.position.copy(),
+            child = Predator.spawn(
+                self.life_queue,
+                self.position,
                 self.spatial_grid,
                 self.bugs_group,
                 self.predators_group,
                 self.smell_map,
+                self.random_source,
+                (self.screen_width, self.screen_height),
             )
             self.energy //= 2
             child.energy = self.energy
-            self.spatial_grid.add(child)
-            self.spatial_grid.update(child)
             self.dirty = 1
@@ -0,0 +1,73 @@
+import bisect
+
+import numpy as np
+
+# ile liczb losujemy naraz do wydawania pojedynczo
+BLOCK_SIZE = 1 << 16
+
+
+class RandomSource:
+    """Źródło losowości symulacji oparte na np.random.Generator.
+
+    Pojedyncze wywołania np.random mają duży stały koszt, więc liczby
+    losowane są blokami i wydawane po jednej z listy Pythona.
+    """
+
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        """
+        Args:
+            seed (int | None): Ziarno dla powtarzalnych przebiegów.
+            block_size (int): Ile liczb losować naraz.
+        """
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        self._block = []
+        self._index = 0
+
+    def random(self):
+        """Zwraca liczbę z przedziału [0, 1)."""
+        if self._index == len(self._block):
+            self._block = self.generator.random(self.block_size).tolist()
+            self._index = 0
+        value = self._block[self._index]
+        self._index += 1
+        return value
+
+    def integers(self, low, high):
+        """Zwraca liczbę całkowitą z przedziału [low, high)."""
+        return low + int((high - low) * self.random())
+
+    def choice(self, options, p=None):
+        """Wybiera element, opcjonalnie z prawdopodobieństwami p."""
+        if p is None:
+            return options[int(len(options) * self.random())]
+        return options[self.sample_cumulative(np.cumsum(p).tolist())]
+
+    def sample_cumulative(self, cumulative):
+        """Losuje indeks z gotowej dystrybuanty.
+
+        Args:
+            cumulative (Sequence[float]): Niemalejące sumy wag.
+
+        Returns:
+            int: Indeks wylosowanego elementu.
+        """
+        # odwracanie dystrybuanty zamiast np.random.choice(p=...)
+        index = bisect.bisect_right(cumulative, self.random() * cumulative[-1])
+        return min(index, len(cumulative) - 1)
+
+    def random_array(self, size):
+        """Losuje od razu całą tablicę liczb z przedziału [0, 1)."""
+        return self.generator.random(size)
+
+    def integers_array(self, low, high, size):
+        """Losuje od razu całą tablicę liczb całkowitych z [low, high)."""
+        return self.generator.integers(low, high, size)
+
+    def poisson(self, lam):
+        """Losuje liczbę zdarzeń o średniej lam (rozkład Poissona)."""
+        return int(self.generator.poisson(lam))
+
+
+# źródło dla obiektów tworzonych bez jawnie podanego źródła
+DEFAULT_RANDOM = RandomSource()
@@ -1,21 +1,64 @@
 import numpy as np
 import pygame as pg
-from consts import TILE_SIZE
+from consts import (
+    SMELL_BACKEND,
+    SMELL_DECAY,
+    SMELL_EPSILON,
+    SMELL_REFRESH_EVERY,
+    SMELL_TILE_SIZE,
+    TILE_SIZE,
+)
 from scipy.ndimage import convolve
 
 
 class SmellMap:
-    def __init__(self, width, height):
+    def __init__(
+        self,
+        width,
+        height,
+        backend=SMELL_BACKEND,
+        refresh_every=SMELL_REFRESH_EVERY,
+    ):
+        """
+        Args:
+            width (int): Szerokość świata w pikselach.
+            height (int): Wysokość świata w pikselach.
+            backend (str): "stencil" liczy dyfuzję w miejscu na dwóch
+            buforach, "convolve" używa scipy.ndimage.convolve.
+            refresh_every (int): Co ile klatek przeliczać warstwę zapachu.
+        """
+        if backend not in ("stencil", "convolve"):
+            raise ValueError(f"Nieznany backend dyfuzji: {backend}")
+        self.backend = backend
         self.width = width
         self.height = height
 
         self.grid_width = width // TILE_SIZE
         self.grid_height = height // TILE_SIZE
 
-        self.grid = np.zeros(
-            (self.grid_height, self.grid_width),
-            dtype=np.float32,
+        self.allocate_buffers(self.grid_height, self.grid_width)
+
+        # warstwa zapachu trzymana między klatkami
+        self.refresh_every = refresh_every
+        self.frames_since_refresh = refresh_every
+        self.smell_surface = pg.Surface(
+            (self.grid_width, self.grid_height), depth=32
+        )
+        self.scaled_surface = None
+        # paleta: jasność -> gotowy piksel powierzchni; zielony nasycamy,
+        # zamiast pozwalać mu się przepełniać w uint8
+        self.palette = np.array(
+            [
+                self.smell_surface.map_rgb((level, min(10 * level, 255), level))
+                for level in range(256)
+            ],
+            dtype=np.uint32,
         )
+        # bufory w kolejności (x, y), jak oczekuje surfarray
+        shape = (self.grid_width, self.grid_height)
+        self.levels = np.zeros(shape, dtype=np.float32)
+        self.indices = np.zeros(shape, dtype=np.uint8)
+        self.pixels = np.zeros(shape, dtype=np.uint32)
 
         self.kernel = np.array(
             [
@@ -25,6 +68,35 @@ class SmellMap:
             ],
             dtype=np.float32,
         )
+        # jądro to środek plus jednorodny pierścień, więc
+        # wynik = (środek - pierścień) * grid + pierścień * suma 3x3;
+        # zanikanie wliczamy od razu w wagi
+        self.ring_weight = SMELL_DECAY * self.kernel[0, 0]
+        self.center_weight = SMELL_DECAY * (self.kernel[1, 1] - self.kernel[0, 0])
+
+    def allocate_buffers(self, rows, cols):
+        """Przygotowuje bufory dyfuzji.
+
+        Args:
+            rows (int): Liczba wierszy bufora bez obwódki (co najmniej
+            wysokość siatki).
+            cols (int): Liczba kolumn bufora bez obwódki (co najmniej
+            szerokość siatki).
+        """
+        # dwa bufory z zerową obwódką (odpowiednik mode="constant"),
+        # zamieniane miejscami co krok zamiast alokowania nowej tablicy
+        self.buffers = [
+            np.zeros((rows + 2, cols + 2), dtype=np.float32) for _ in range(2)
+        ]
+        self.current = 0
+        # sumy z trzech sąsiednich kolumn, dla każdego wiersza z obwódką
+        self.row_sums = np.zeros((rows + 2, cols), dtype=np.float32)
+        # self.grid to zawsze wnętrze bieżącego bufora
+        self.grid = self.interior(self.buffers[self.current])
+
+    def interior(self, buffer):
+        """Zwraca widok komórek siatki w buforze z obwódką."""
+        return buffer[1 : self.grid_height + 1, 1 : self.grid_width + 1]
 
     def add_smell_source(self, x, y, amount=1.0):
         """Dodaje zapach w miejscu ofiary."""
@@ -32,24 +104,220 @@ class SmellMap:
         if 0 <= gx < self.grid_width and 0 <= gy < self.grid_height:
             self.grid[gy, gx] += amount
 
+    def add_smell_sources(self, xs, ys, amount=1.0):
+        """Dodaje zapach naraz w wielu miejscach.
+
+        Args:
+            xs, ys (np.ndarray): Całkowite współrzędne w pikselach.
+            amount (float): Ilość zapachu na źródło.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Komórki, które dostały zapach.
+        """
+        gx, gy = xs // TILE_SIZE, ys // TILE_SIZE
+        inside = (gx >= 0) & (gx < self.grid_width) & (gy >= 0)
+        inside &= gy < self.grid_height
+        gx, gy = gx[inside], gy[inside]
+        # kilka źródeł w jednej komórce musi się zsumować
+        np.add.at(self.grid, (gy, gx), amount)
+        return gx, gy
+
     def diffuse(self):
         """Aktualizuje mapę zapachu według modelu dyfuzji."""
-        self.grid = convolve(self.grid, self.kernel, mode="constant", cval=0.0)
-        self.grid *= 0.99
+        source = self.buffers[self.current]
+        self.current = 1 - self.current
+        target = self.buffers[self.current]
+
+        if self.backend == "convolve":
+            output = self.interior(target)
+            convolve(
+                self.grid,
+                self.kernel,
+                output=output,
+                mode="constant",
+                cval=0.0,
+            )
+            output *= SMELL_DECAY
+        else:
+            self.diffuse_region(
+                source, target, 0, self.grid_height, 0, self.grid_width
+            )
+
+        self.grid = self.interior(target)
+
+    def diffuse_region(self, source, target, y0, y1, x0, x1):
+        """Liczy dyfuzję dla prostokąta komórek bez żadnych alokacji.
+
+        Args:
+            source (np.ndarray): Bufor z obwódką ze stanem sprzed kroku.
+            target (np.ndarray): Bufor z obwódką na wynik.
+            y0, y1 (int): Zakres wierszy siatki [y0, y1).
+            x0, x1 (int): Zakres kolumn siatki [x0, x1).
+        """
+        padded = source[y0 : y1 + 2, x0 : x1 + 2]
+        output = target[y0 + 1 : y1 + 1, x0 + 1 : x1 + 1]
+        # suma 3x3 rozbita na sumy w wierszach i w kolumnach
+        row_sums = self.row_sums[: y1 - y0 + 2, : x1 - x0]
+        np.add(padded[:, :-2], padded[:, 1:-1], out=row_sums)
+        np.add(row_sums, padded[:, 2:], out=row_sums)
+        np.add(row_sums[:-2], row_sums[1:-1], out=output)
+        np.add(output, row_sums[2:], out=output)
+        output *= self.ring_weight
+        # sumy wierszy już niepotrzebne, więc trzymamy w nich środek
+        center = row_sums[1:-1]
+        np.multiply(padded[1:-1, 1:-1], self.center_weight, out=center)
+        output += center
 
     def render(self, surface):
         """Rysuje zapach pozostający za ofiarą na ekranie."""
-        smell_surface = pg.Surface((self.grid_width, self.grid_height))
-        smell_array = pg.surfarray.pixels3d(smell_surface)
+        if self.scaled_surface is None or (
+            self.scaled_surface.get_size() != surface.get_size()
+        ):
+            self.scaled_surface = pg.Surface(surface.get_size(), depth=32)
+            self.frames_since_refresh = self.refresh_every
+
+        self.frames_since_refresh += 1
+        if self.frames_since_refresh >= self.refresh_every:
+            self.frames_since_refresh = 0
+            self.refresh_surface()
+
+        surface.blit(self.scaled_surface, (0, 0))
+
+    def refresh_surface(self):
+        """Przelicza warstwę zapachu w istniejących buforach."""
+        np.multiply(self.grid.T, 50, out=self.levels)
+        np.clip(self.levels, 0, 255, out=self.levels)
+        self.indices[...] = self.levels
+        np.take(self.palette, self.indices, out=self.pixels)
+        pg.surfarray.blit_array(self.smell_surface, self.pixels)
+        pg.transform.scale(
+            self.smell_surface,
+            self.scaled_surface.get_size(),
+            self.scaled_surface,
+        )
+
+
+class TiledSmellMap(SmellMap):
+    """Mapa zapachu liczona tylko na aktywnych kafelkach.
+
+    Kafelek jest aktywny, gdy dostał zapach albo ma wartość powyżej
+    progu. Uśpione kafelki są w obu buforach zerowe, więc odczyty
+    self.grid zwracają dla nich zero bez dodatkowego sprawdzania.
+    """
+
+    def __init__(
+        self,
+        width,
+        height,
+        tile_size=SMELL_TILE_SIZE,
+        epsilon=SMELL_EPSILON,
+        refresh_every=SMELL_REFRESH_EVERY,
+    ):
+        """
+        Args:
+            width (int): Szerokość świata w pikselach.
+            height (int): Wysokość świata w pikselach.
+            tile_size (int): Bok kafelka w komórkach siatki.
+            epsilon (float): Próg, poniżej którego kafelek zasypia.
+            refresh_every (int): Co ile klatek przeliczać warstwę zapachu.
+        """
+        super().__init__(
+            width, height, backend="stencil", refresh_every=refresh_every
+        )
+        self.tile_size = tile_size
+        self.epsilon = epsilon
+        self.tile_rows = -(-self.grid_height // tile_size)
+        self.tile_cols = -(-self.grid_width // tile_size)
+        # bufory zaokrąglone do pełnych kafelków; nadmiar zostaje zerowy
+        self.allocate_buffers(
+            self.tile_rows * tile_size, self.tile_cols * tile_size
+        )
+        # widoki (wiersz kafla, y, kolumna kafla, x) na wnętrze buforów
+        self.tile_views = [
+            buffer[1:-1, 1:-1].reshape(
+                self.tile_rows, tile_size, self.tile_cols, tile_size
+            )
+            for buffer in self.buffers
+        ]
+        self.active = np.zeros((self.tile_rows, self.tile_cols), dtype=bool)
+
+    def add_smell_source(self, x, y, amount=1.0):
+        """Dodaje zapach w miejscu ofiary i budzi jej kafelek."""
+        super().add_smell_source(x, y, amount)
+        gx, gy = x // TILE_SIZE, y // TILE_SIZE
+        if 0 <= gx < self.grid_width and 0 <= gy < self.grid_height:
+            self.active[gy // self.tile_size, gx // self.tile_size] = True
+
+    def add_smell_sources(self, xs, ys, amount=1.0):
+        """Dodaje zapach w wielu miejscach i budzi ich kafelki."""
+        gx, gy = super().add_smell_sources(xs, ys, amount)
+        self.active[gy // self.tile_size, gx // self.tile_size] = True
+        return gx, gy
+
+    @staticmethod
+    def tile_runs(mask):
+        """Zwraca ciągłe odcinki zaznaczonych kafelków w wierszach.
+
+        Args:
+            mask (np.ndarray): Maska kafelków (wiersze x kolumny).
+
+        Returns:
+            list[tuple[int, int, int]]: Trójki (wiersz, początek, koniec).
+        """
+        rows, cols = mask.shape
+        framed = np.zeros((rows, cols + 2), dtype=bool)
+        framed[:, 1:-1] = mask
+        # krawędzie odcinków, w każdym wierszu na przemian początek i koniec
+        edge_rows, edge_cols = np.nonzero(framed[:, 1:] != framed[:, :-1])
+        return list(
+            zip(
+                edge_rows[::2].tolist(),
+                edge_cols[::2].tolist(),
+                edge_cols[1::2].tolist(),
+            )
+        )
+
+    def diffuse(self):
+        """Aktualizuje zapach tylko na aktywnych kafelkach i ich obwódce."""
+        source_index = self.current
+        self.current = 1 - self.current
+        source = self.buffers[source_index]
+        target = self.buffers[self.current]
+        size = self.tile_size
 
-        norm_grid = np.clip(self.grid * 50, 0, 255).astype(np.uint8)
-        norm_grid = norm_grid.T
+        # aktywne kafelki plus jedna komórka obwódki, bo zapach
+        # rozchodzi się o jedną komórkę na krok
+        for row, start, stop in self.tile_runs(self.active):
+            self.diffuse_region(
+                source,
+                target,
+                max(row * size - 1, 0),
+                min((row + 1) * size + 1, self.grid_height),
+                max(start * size - 1, 0),
+                min(stop * size + 1, self.grid_width),
+            )
 
-        smell_array[:, :, 0] = norm_grid  # R
-        smell_array[:, :, 1] = 10 * norm_grid  # G
-        smell_array[:, :, 2] = norm_grid  # B
+        # obwódka mogła trafić do sąsiednich, także ukośnie, kafelków
+        touched = self.active.copy()
+        touched[1:] |= self.active[:-1]
+        touched[:-1] |= self.active[1:]
+        vertical = touched.copy()
+        touched[:, 1:] |= vertical[:, :-1]
+        touched[:, :-1] |= vertical[:, 1:]
 
-        del smell_array
+        was_active = self.active
+        self.active = np.zeros_like(was_active)
+        source_tiles = self.tile_views[source_index]
+        target_tiles = self.tile_views[self.current]
+        for row, start, stop in self.tile_runs(touched):
+            maxima = target_tiles[row, :, start:stop, :].max(axis=(0, 2))
+            self.active[row, start:stop] = maxima > self.epsilon
+            # usypiane kafelki zerujemy w obu buforach
+            for col in np.flatnonzero(maxima <= self.epsilon).tolist():
+                col += start
+                if maxima[col - start] > 0:
+                    target_tiles[row, :, col, :] = 0
+                if was_active[row, col]:
+                    source_tiles[row, :, col, :] = 0
 
-        scaled = pg.transform.scale(smell_surface, surface.get_size())
-        surface.blit(scaled, (0, 0))
+        self.grid = self.interior(target)
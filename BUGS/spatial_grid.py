@@ -1,19 +1,33 @@
 from collections import defaultdict
 
+import numpy as np
 import pygame as pg
 
+# przesunięcia do komórek 3x3 wokół komórki (łącznie z nią samą)
+NEIGHBOR_OFFSETS = tuple((dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+
 
 class SpatialGrid:
+    # rodzaje sprite'ów trzymane w osobnych warstwach
+    kinds = ("food", "bug", "predator")
+
     def __init__(self, width, height, cell_size):
         self.cell_size = cell_size
-        self.grid = defaultdict(set)
+        # osobna warstwa komórek na każdy rodzaj, żeby zapytania
+        # "jedzenie obok mnie" nie przeglądały bugów i predatorów;
+        # komórka to słownik (nie zbiór), by kolejność sprite'ów zależała
+        # od kolejności dodania, a nie od id, i przebiegi z ziarnem się
+        # powtarzały
+        self.layers = {kind: defaultdict(dict) for kind in self.kinds}
         self.width = width
         self.height = height
+        self.columns = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
 
     def _get_cell(self, pos: pg.math.Vector2) -> tuple[int, int] | None:
         """Pobiera współrzędne komórki na podstawie pozycji."""
         x, y = int(pos.x // self.cell_size), int(pos.y // self.cell_size)
-        if 0 <= x < self.width and 0 <= y < self.height:
+        if 0 <= x < self.columns and 0 <= y < self.rows:
             return (x, y)
         return None
 
@@ -21,14 +35,40 @@ class SpatialGrid:
         """Dodaje sprite do odpowiedniej komórki."""
         cell = self._get_cell(sprite.position)
         if cell:
-            self.grid[cell].add(sprite)
+            self.layers[sprite.spatial_kind][cell][sprite] = None
             sprite._spatial_cell = cell
 
+    def add_many(self, sprites) -> None:
+        """Dodaje naraz wiele sprite'ów, licząc komórki jednym przebiegiem.
+
+        Args:
+            sprites (list): Sprite'y do dodania (dowolnych rodzajów).
+        """
+        if not sprites:
+            return
+        layers = self.layers
+        positions = np.array([(s.position.x, s.position.y) for s in sprites])
+        columns = (positions[:, 0] // self.cell_size).astype(np.intp)
+        rows = (positions[:, 1] // self.cell_size).astype(np.intp)
+        inside = (
+            (columns >= 0)
+            & (columns < self.columns)
+            & (rows >= 0)
+            & (rows < self.rows)
+        )
+        for sprite, x, y, ok in zip(
+            sprites, columns.tolist(), rows.tolist(), inside.tolist()
+        ):
+            if ok:
+                layers[sprite.spatial_kind][(x, y)][sprite] = None
+                sprite._spatial_cell = (x, y)
+
     def remove(self, sprite) -> None:
         """Usuwa sprite z jego aktualnej komórki."""
         cell = getattr(sprite, "_spatial_cell", None)
-        if cell and sprite in self.grid[cell]:
-            self.grid[cell].remove(sprite)
+        layer = self.layers[sprite.spatial_kind]
+        if cell:
+            layer[cell].pop(sprite, None)
         sprite._spatial_cell = None
 
     def update(self, sprite) -> None:
@@ -36,24 +76,157 @@ class SpatialGrid:
         new_cell = self._get_cell(sprite.position)
         old_cell = getattr(sprite, "_spatial_cell", None)
         if new_cell != old_cell:
+            layer = self.layers[sprite.spatial_kind]
             if old_cell:
-                self.grid[old_cell].discard(sprite)
+                layer[old_cell].pop(sprite, None)
             if new_cell:
-                self.grid[new_cell].add(sprite)
+                layer[new_cell][sprite] = None
             sprite._spatial_cell = new_cell
 
-    def get_nearby(self, sprite) -> list:
-        """Zwraca listę sprite'ów z sąsiednich komórek (włączając aktualną)."""
+    def get_nearby(self, sprite, kind=None) -> list:
+        """Zwraca listę sprite'ów z sąsiednich komórek (włączając aktualną).
+
+        Args:
+            sprite: Sprite, wokół którego szukamy.
+            kind (str | None): Rodzaj szukanych sprite'ów;
+            None oznacza wszystkie rodzaje.
+        """
         cell = self._get_cell(sprite.position)
         if not cell:
             return
         sx, sy = cell
+        layers = self.layers.values() if kind is None else (self.layers[kind],)
         seen = set()  # by nie powtórzyć sprite’ów
+        for layer in layers:
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    c = (sx + dx, sy + dy)
+                    if c in layer:
+                        for s in layer[c]:
+                            if s is not sprite and s not in seen:
+                                seen.add(s)
+                                yield s
+
+    def count_nearby(self, sprite, kind) -> int:
+        """Zlicza sprite'y danego rodzaju w sąsiednich komórkach.
+
+        Args:
+            sprite: Sprite, wokół którego liczymy (sam nie jest liczony).
+            kind (str): Rodzaj liczonych sprite'ów.
+        """
+        cell = self._get_cell(sprite.position)
+        if not cell:
+            return 0
+        sx, sy = cell
+        layer = self.layers[kind]
+        count = 0
         for dx in (-1, 0, 1):
             for dy in (-1, 0, 1):
                 c = (sx + dx, sy + dy)
-                if c in self.grid:
-                    for s in self.grid[c]:
-                        if s is not sprite and s not in seen:
-                            seen.add(s)
-                            yield s
+                if c in layer:
+                    count += len(layer[c])
+        if sprite.spatial_kind == kind and sprite in layer.get(cell, ()):
+            count -= 1
+        return count
+
+
+class ArrayGrid:
+    """Siatka przestrzenna na tablicach, przebudowywana raz na krok.
+
+    Komórki są liczbami całkowitymi, a indeksy punktów leżą posortowane
+    po komórkach (sortowanie przez zliczanie), więc zapytania nie
+    potrzebują haszowania ani zbiorów dla pojedynczych sprite'ów.
+    """
+
+    def __init__(self, width, height, cell_size):
+        """
+        Args:
+            width, height (int): Rozmiar świata w pikselach.
+            cell_size (float): Bok komórki w pikselach.
+        """
+        self.cell_size = cell_size
+        self.columns = max(1, int(np.ceil(width / cell_size)))
+        self.rows = max(1, int(np.ceil(height / cell_size)))
+        self.order = np.zeros(0, dtype=np.intp)
+        self.counts = np.zeros(self.columns * self.rows, dtype=np.intp)
+        self.starts = np.zeros(self.columns * self.rows, dtype=np.intp)
+
+    def cells_of(self, positions):
+        """Zwraca kolumny i wiersze komórek dla tablicy pozycji (n, 2)."""
+        columns = (positions[:, 0] // self.cell_size).astype(np.intp)
+        rows = (positions[:, 1] // self.cell_size).astype(np.intp)
+        np.clip(columns, 0, self.columns - 1, out=columns)
+        np.clip(rows, 0, self.rows - 1, out=rows)
+        return columns, rows
+
+    def rebuild(self, positions):
+        """Układa indeksy punktów według komórek.
+
+        Args:
+            positions (np.ndarray): Tablica (n, 2) pozycji w pikselach.
+        """
+        columns, rows = self.cells_of(positions)
+        cells = rows * self.columns + columns
+        if self.columns * self.rows <= 1 << 16:
+            # stabilne sortowanie liczb 16-bitowych to w NumPy sortowanie
+            # pozycyjne (dwa przebiegi zliczania), więc O(n) bez porównań
+            cells = cells.astype(np.uint16)
+        # punkty z jednej komórki leżą w order obok siebie,
+        # od starts[c] przez counts[c] pozycji
+        self.order = np.argsort(cells, kind="stable")
+        self.counts = np.bincount(cells, minlength=self.columns * self.rows)
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def nearby(self, position):
+        """Zwraca indeksy punktów z komórek 3x3 wokół pozycji."""
+        columns, rows = self.cells_of(np.asarray([position], dtype=np.float64))
+        _, j = self.pairs_in_cells(columns, rows)
+        return j
+
+    def count_nearby(self, positions):
+        """Zlicza punkty w komórkach 3x3 wokół każdej pozycji.
+
+        Args:
+            positions (np.ndarray): Tablica (n, 2) pozycji zapytań.
+
+        Returns:
+            np.ndarray: Liczba punktów dla każdej pozycji.
+        """
+        columns, rows = self.cells_of(positions)
+        counts = np.zeros((self.rows + 2, self.columns + 2), dtype=np.intp)
+        counts[1:-1, 1:-1] = self.counts.reshape(self.rows, self.columns)
+        return sum(
+            counts[rows + 1 + dy, columns + 1 + dx] for dx, dy in NEIGHBOR_OFFSETS
+        )
+
+    def pairs_nearby(self, positions):
+        """Zwraca wszystkie pary (zapytanie, punkt) z sąsiednich komórek.
+
+        Args:
+            positions (np.ndarray): Tablica (n, 2) pozycji zapytań.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Indeksy zapytań i punktów.
+        """
+        columns, rows = self.cells_of(positions)
+        return self.pairs_in_cells(columns, rows)
+
+    def pairs_in_cells(self, columns, rows):
+        queries = np.arange(len(columns))
+        chunks_i, chunks_j = [], []
+        for dx, dy in NEIGHBOR_OFFSETS:
+            c, r = columns + dx, rows + dy
+            valid = (c >= 0) & (c < self.columns) & (r >= 0) & (r < self.rows)
+            cells = np.where(valid, r * self.columns + c, 0)
+            sizes = np.where(valid, self.counts[cells], 0)
+            total = int(sizes.sum())
+            if total == 0:
+                continue
+            first = np.repeat(self.starts[cells], sizes)
+            within = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            chunks_i.append(np.repeat(queries, sizes))
+            chunks_j.append(self.order[first + within])
+        if not chunks_i:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty
+        return np.concatenate(chunks_i), np.concatenate(chunks_j)
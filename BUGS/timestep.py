@@ -0,0 +1,95 @@
+import time
+from typing import Callable, Optional
+
+
+class FixedTimestep:
+    """Planer kroków o stałym czasie, niezależny od rysowania.
+
+    Akumuluje upływający czas i zamienia go na liczbę kroków symulacji
+    do wykonania, a osobno decyduje, czy w danej chwili rysować klatkę.
+    """
+
+    def __init__(
+        self,
+        tick_rate: Optional[float],
+        frame_rate: float,
+        render_every: int = 1,
+        max_ticks_per_frame: int = 10,
+        max_skipped_frames: int = 5,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """
+        Args:
+            tick_rate (float | None): Kroki symulacji na sekundę;
+            None oznacza przewijanie bez limitu.
+            frame_rate (float): Docelowa liczba klatek na sekundę.
+            render_every (int): Co ile kroków rysować przy przewijaniu.
+            max_ticks_per_frame (int): Najwięcej kroków przed jednym rysowaniem.
+            max_skipped_frames (int): Ile klatek z rzędu można pominąć,
+            gdy symulacja nie nadąża.
+            clock (Callable[[], float]): Źródło czasu w sekundach.
+        """
+        if tick_rate is not None and tick_rate <= 0:
+            raise ValueError(
+                f"Liczba kroków na sekundę musi być dodatnia: {tick_rate}"
+            )
+        self.tick_rate = tick_rate
+        self.tick_duration: float = 1 / tick_rate if tick_rate is not None else 0.0
+        self.frame_duration: float = 1 / frame_rate
+        self.render_every = max(1, render_every)
+        # ograniczenie, żeby wolna symulacja nie wpadła w spiralę nadrabiania
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.max_skipped_frames = max_skipped_frames
+        self.clock = clock
+
+        self.behind: bool = False
+        self._accumulator: float = 0.0
+        self._skipped_frames: int = 0
+        self._last_time: float = clock()
+        self._last_render: float = -self.frame_duration
+
+    def advance(self) -> int:
+        """Zwraca liczbę kroków symulacji do wykonania przed rysowaniem."""
+        if self.tick_rate is None:
+            return self.render_every
+        now = self.clock()
+        self._accumulator += now - self._last_time
+        self._last_time = now
+
+        ticks = int(self._accumulator // self.tick_duration)
+        ticks = min(ticks, self.max_ticks_per_frame)
+        self._accumulator -= ticks * self.tick_duration
+        # zaległości większe niż jedna porcja kroków po prostu porzucamy
+        self._accumulator = min(
+            self._accumulator, self.max_ticks_per_frame * self.tick_duration
+        )
+        self.behind = self._accumulator >= self.tick_duration
+        return ticks
+
+    def should_render(self) -> bool:
+        """Sprawdza, czy w tej chwili należy narysować klatkę."""
+        if self.tick_rate is None:
+            return True
+        now = self.clock()
+        if now - self._last_render < self.frame_duration:
+            return False
+        # gdy nie nadążamy, pomijamy rysowanie, ale nie w nieskończoność
+        if self.behind and self._skipped_frames < self.max_skipped_frames:
+            self._skipped_frames += 1
+            return False
+        self._skipped_frames = 0
+        self._last_render = now
+        return True
+
+    def wait(self) -> None:
+        """Czeka do najbliższego kroku albo najbliższej klatki."""
+        if self.tick_rate is None or self.behind:
+            return
+        now = self.clock()
+        next_tick = now + self.tick_duration - self._accumulator - (
+            now - self._last_time
+        )
+        next_frame = self._last_render + self.frame_duration
+        delay = min(next_tick, next_frame) - now
+        if delay > 0:
+            time.sleep(delay)